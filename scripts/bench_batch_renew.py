@@ -0,0 +1,216 @@
+# %% Imports
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from asyncio import run
+
+from starknet_py.net.client_errors import ClientError
+from starknet_py.transaction_errors import TransactionFailedError
+
+from utils.context import get_context
+from utils.devnet import DOMAIN_BASE
+from utils.fees import FeeModel
+from utils.pipeline import dump_json_atomic
+from utils.pricing import get_price_table
+from utils.renewal import (
+    AUTO_RENEWAL,
+    MAX_CALLDATA_FELTS,
+    MAX_STEPS,
+    Renewal,
+    batch_renew_call,
+    max_batch_size,
+)
+from utils.starknet import get_deployments, get_nonce_manager, get_starknet_account
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# batch sizes to measure, doubling from 1 up to the computed max batch size by
+# default, eg. "1,10,50,100". Measuring stops at the first failing size.
+BENCH_SIZES = os.getenv("BENCH_SIZES")
+# first identity id of the domains to renew, as created by load_devnet.py.
+# Each size renews new domains, they must all be inside their renewal window.
+BENCH_OFFSET = int(os.getenv("BENCH_OFFSET", 1_000_000))
+BENCH_TAX_BPS = int(os.getenv("BENCH_TAX_BPS", 0))
+# written to <BENCH_OUTPUT>.json and <BENCH_OUTPUT>.csv
+BENCH_OUTPUT = os.getenv(
+    "BENCH_OUTPUT", get_context().deployments_dir / "bench_batch_renew"
+)
+# batch_renew or batch_renew_aggregated, both take the same calldata
+BENCH_ENTRYPOINT = os.getenv("BENCH_ENTRYPOINT", "batch_renew")
+# thresholds of a previous run to check this one against
+BENCH_BASELINE = os.getenv("BENCH_BASELINE")
+# thresholds allow this relative increase of the per domain costs
+BENCH_TOLERANCE = float(os.getenv("BENCH_TOLERANCE", 0.1))
+
+COLUMNS = [
+    "size",
+    "steps",
+    "gas",
+    "fee",
+    "calldata",
+    "seconds",
+    "steps_per_domain",
+    "gas_per_domain",
+    "fee_per_domain",
+    "calldata_per_domain",
+    "seconds_per_domain",
+]
+# per domain costs checked against the baseline, from the fitted curves
+CHECKED = ["steps", "gas", "fee"]
+
+
+def get_sizes():
+    if BENCH_SIZES:
+        return [int(size) for size in BENCH_SIZES.split(",")]
+    sizes, size = [], 1
+    while size < max_batch_size():
+        sizes.append(size)
+        size *= 2
+    return sizes + [max_batch_size()]
+
+
+async def measure(account, nonce_manager, address, renewals):
+    call = batch_renew_call(renewals, address, entrypoint=BENCH_ENTRYPOINT)
+    if nonce_manager.nonce is None:
+        await nonce_manager.resync()
+    fees = nonce_manager.fees
+    (estimate,) = await fees.estimate(
+        [
+            await account.sign_invoke_transaction(
+                call, nonce=nonce_manager.nonce, max_fee=0
+            )
+        ]
+    )
+    start = time.perf_counter()
+    _, receipt = await nonce_manager.invoke(
+        call, max_fee=fees.with_margin(estimate.overall_fee)
+    )
+    receipt = await receipt
+    seconds = time.perf_counter() - start
+    size = len(renewals)
+    row = {
+        "size": size,
+        "steps": receipt.execution_resources["n_steps"],
+        "gas": estimate.gas_usage,
+        "fee": receipt.actual_fee,
+        "calldata": len(call.calldata),
+        "seconds": seconds,
+    }
+    for name in ("steps", "gas", "fee", "calldata", "seconds"):
+        row[f"{name}_per_domain"] = row[name] / size
+    return row
+
+
+def fit(rows):
+    # linear curves value = base + per_domain * size of the measured values
+    curves = {}
+    for name in CHECKED:
+        model = FeeModel(window=len(rows))
+        for row in rows:
+            model.observe(row["size"], row[name])
+        result = model.fit()
+        if result is not None:
+            curves[name] = {"base": result[0], "per_domain": result[1]}
+    return curves
+
+
+def largest_batch(curves):
+    # largest batch under the step and calldata limits according to the curves
+    steps = curves.get("steps")
+    by_steps = max_batch_size()
+    if steps and steps["per_domain"] > 0:
+        by_steps = int((MAX_STEPS - steps["base"]) / steps["per_domain"])
+    by_calldata = max_batch_size(max_steps=float("inf"))
+    return max(1, min(by_steps, by_calldata))
+
+
+def check_baseline(curves, baseline):
+    failures = 0
+    for name, threshold in baseline["thresholds"].items():
+        if name not in curves:
+            continue
+        per_domain = curves[name]["per_domain"]
+        if per_domain > threshold:
+            failures += 1
+            logger.error(
+                f"❌ {name} per domain is {per_domain:.0f}, over {threshold:.0f}"
+            )
+        else:
+            logger.info(f"✅ {name} per domain is {per_domain:.0f} ({threshold:.0f})")
+    return failures
+
+
+def dump(rows, curves):
+    results = {
+        "rows": rows,
+        "curves": curves,
+        "max_batch_size": largest_batch(curves),
+        "limits": {"steps": MAX_STEPS, "calldata": MAX_CALLDATA_FELTS},
+        "thresholds": {
+            name: curve["per_domain"] * (1 + BENCH_TOLERANCE)
+            for name, curve in curves.items()
+        },
+    }
+    dump_json_atomic(results, f"{BENCH_OUTPUT}.json")
+    with open(f"{BENCH_OUTPUT}.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    logger.info(f"✅ Results written to {BENCH_OUTPUT}.json and {BENCH_OUTPUT}.csv")
+    return results
+
+
+# %% Main
+async def main():
+    # read first, the baseline may be the output of the previous run
+    baseline = json.load(open(BENCH_BASELINE)) if BENCH_BASELINE else None
+    account = await get_starknet_account()
+    nonce_manager = await get_nonce_manager(account)
+    address = int(get_deployments()[AUTO_RENEWAL]["address"], 16)
+    sizes = get_sizes()
+    domains = [DOMAIN_BASE + BENCH_OFFSET + i for i in range(sum(sizes))]
+    domain_prices, tax_prices = await get_price_table().get_prices(
+        domains, tax_bps=BENCH_TAX_BPS
+    )
+    renewals = [
+        Renewal(domain, account.address, domain_price, tax_price, 0)
+        for domain, domain_price, tax_price in zip(domains, domain_prices, tax_prices)
+    ]
+
+    rows, start = [], 0
+    for size in sizes:
+        try:
+            row = await measure(
+                account, nonce_manager, address, renewals[start : start + size]
+            )
+        except (ClientError, TransactionFailedError) as e:
+            logger.warning(
+                f"⚠️  {BENCH_ENTRYPOINT} of {size} domains failed, stopping: {e}"
+            )
+            break
+        start += size
+        rows.append(row)
+        logger.info(
+            f"ℹ️  {size} domains: {row['steps_per_domain']:.0f} steps, "
+            f"{row['gas_per_domain']:.0f} gas, {row['fee_per_domain']:.0f} wei, "
+            f"{row['calldata_per_domain']:.1f} felts and "
+            f"{row['seconds_per_domain'] * 1000:.1f}ms per domain"
+        )
+    if not rows:
+        logger.error(f"❌ No {BENCH_ENTRYPOINT} went through")
+        sys.exit(1)
+
+    results = dump(rows, fit(rows))
+    logger.info(f"ℹ️  Largest batch under the limits: {results['max_batch_size']}")
+    if baseline is not None:
+        sys.exit(1 if check_baseline(results["curves"], baseline) else 0)
+
+
+# %% Run
+if __name__ == "__main__":
+    run(main())
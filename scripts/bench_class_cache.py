@@ -0,0 +1,44 @@
+# %% Imports
+import logging
+import tempfile
+import time
+
+from utils.class_cache import get_cairo0_class
+from utils.constants import COMPILED_CONTRACTS_DEVNET_V0
+from utils.starknet import get_v0_artifact
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def timed(compute):
+    start = time.perf_counter()
+    compute()
+    return time.perf_counter() - start
+
+
+# %% Main
+def main():
+    # a fresh cache directory, so the first pass is always cold
+    with tempfile.TemporaryDirectory() as cache_dir:
+        total_cold, total_warm = 0, 0
+        for contract in COMPILED_CONTRACTS_DEVNET_V0:
+            artifact = get_v0_artifact(contract["contract_name"])
+            cold = timed(lambda: get_cairo0_class(artifact, cache_dir))
+            warm = timed(lambda: get_cairo0_class(artifact, cache_dir))
+            total_cold += cold
+            total_warm += warm
+            logger.info(
+                f"ℹ️  {contract['contract_name']}: cold {cold * 1000:.0f}ms, "
+                f"warm {warm * 1000:.1f}ms"
+            )
+        logger.info(
+            f"✅ {len(COMPILED_CONTRACTS_DEVNET_V0)} classes: cold "
+            f"{total_cold:.2f}s, warm {total_warm * 1000:.1f}ms"
+        )
+
+
+# %% Run
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# %% Imports
+import logging
+import os
+import random
+import time
+import tracemalloc
+
+from utils.columns import EXPIRY_WINDOW, RENEWAL_COOLDOWN, RenewalColumns
+from utils.starknet import int_to_uint256
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+BENCH_ROWS = int(os.getenv("BENCH_ROWS", 1_000_000))
+NOW = 2 * 86400 * 365
+
+
+def random_rows(count):
+    return [
+        {
+            "renewer": random.randrange(2**251),
+            "domain": random.randrange(2**100),
+            "allowance": random.randrange(2) * random.randrange(2**64),
+            "meta_hash": random.randrange(2**251),
+            "last_renewal": random.randrange(NOW),
+        }
+        for _ in range(count)
+    ]
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+# %% Main
+def main():
+    rows = random_rows(BENCH_ROWS)
+    expiries = {row["domain"]: random.randrange(2 * NOW) for row in rows}
+    price = 2**60
+
+    # the state as dicts of python ints, u256 as int_to_uint256 dicts
+    state, dict_size, dict_build = measure(
+        lambda: {
+            (row["renewer"], row["domain"]): {
+                "allowance": int_to_uint256(row["allowance"]),
+                "meta_hash": row["meta_hash"],
+                "last_renewal": row["last_renewal"],
+                "expiry": expiries[row["domain"]],
+            }
+            for row in rows
+        }
+    )
+    columns, columns_size, columns_build = measure(
+        lambda: RenewalColumns.from_rows(rows, expiries)
+    )
+
+    start = time.perf_counter()
+    from_dicts = [
+        key
+        for key, entry in state.items()
+        if entry["expiry"] <= NOW + EXPIRY_WINDOW
+        and NOW - entry["last_renewal"] > RENEWAL_COOLDOWN
+        and entry["allowance"]["low"] + (entry["allowance"]["high"] << 128) >= price
+    ]
+    dict_filter = time.perf_counter() - start
+    start = time.perf_counter()
+    from_columns = columns.eligible(NOW, price)
+    columns_filter = time.perf_counter() - start
+    assert len(from_dicts) == len(from_columns)
+
+    sample = random.sample(rows, min(10000, len(rows)))
+    start = time.perf_counter()
+    for row in sample:
+        columns.get(row["renewer"], row["domain"])
+    columns_get = (time.perf_counter() - start) / len(sample)
+
+    logger.info(f"ℹ️  {BENCH_ROWS} pairs, {len(from_columns)} eligible")
+    logger.info(
+        f"ℹ️  dicts: {dict_size / BENCH_ROWS:.0f} bytes/pair, built in "
+        f"{dict_build:.2f}s, filtered in {dict_filter * 1000:.0f}ms"
+    )
+    logger.info(
+        f"ℹ️  columns: {columns.nbytes / BENCH_ROWS:.0f} bytes/pair "
+        f"({columns_size / BENCH_ROWS:.0f} traced while building), built in "
+        f"{columns_build:.2f}s, filtered in {columns_filter * 1000:.0f}ms, "
+        f"{columns_get * 1e6:.0f}µs per lookup"
+    )
+
+
+# %% Run
+if __name__ == "__main__":
+    main()
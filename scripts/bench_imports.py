@@ -0,0 +1,207 @@
+# %% Imports
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from aiohttp import web
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SCRIPTS_DIR = Path(__file__).parent
+# modules on the path of a read-only command, they must not import any of
+# the HEAVY_MODULES below
+LIGHT_MODULES = [
+    "utils.constants",
+    "utils.context",
+    "utils.calldata",
+    "utils.class_cache",
+    "utils.failover",
+    "utils.metrics",
+    "utils.rpc",
+    "utils.starknet",
+]
+# modules sending transactions, only timed
+OTHER_MODULES = ["utils.preflight", "utils.indexer", "utils.nonce", "utils.renewal"]
+# cairo-lang, and the starknet_py modules pulling in sympy through crypto_cpp_py
+HEAVY_MODULES = ("starkware", "sympy", "starknet_py.hash", "starknet_py.net.models")
+IMPORT_RUNS = int(os.getenv("IMPORT_RUNS", 5))
+# fails when a light module takes longer to import, 0 to disable
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", 0))
+# fails when checking one allowance with call_v0 takes longer, 0 to disable
+CALL_BUDGET_MS = float(os.getenv("CALL_BUDGET_MS", 0))
+
+# a read-only command, run in a fresh interpreter against a local stub node:
+# importing the helpers and checking one allowance with call_v0
+CALL_SCRIPT = """
+import asyncio, json, sys, time
+
+start = time.perf_counter()
+from utils.context import get_context
+from utils.starknet import call_v0
+
+
+async def main():
+    try:
+        await call_v0(
+            "auto_renew_contract_AutoRenewal", "get_renewing_allowance", [1, 2], 3
+        )
+    finally:
+        await get_context().rpc.close()
+
+
+asyncio.run(main())
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def import_times(module):
+    # {imported module: cumulative µs} of a fresh interpreter importing module,
+    # run from the repository root like the scripts
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SCRIPTS_DIR.parent,
+        env={**os.environ, "PYTHONPATH": str(SCRIPTS_DIR)},
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+async def start_stub_node():
+    # JSON-RPC node answering the head block and a zero allowance
+    block = {
+        "block_hash": "0x1",
+        "parent_hash": "0x0",
+        "block_number": 1,
+        "sequencer_address": "0x0",
+        "status": "ACCEPTED_ON_L2",
+        "new_root": "0",
+        "transactions": [],
+        "timestamp": 0,
+    }
+
+    async def handle(request):
+        payload = await request.json()
+        requests = payload if isinstance(payload, list) else [payload]
+        responses = [
+            {
+                "jsonrpc": "2.0",
+                "id": r["id"],
+                "result": block if r["method"] != "starknet_call" else ["0x0", "0x0"],
+            }
+            for r in requests
+        ]
+        return web.json_response(
+            responses if isinstance(payload, list) else responses[0]
+        )
+
+    app = web.Application()
+    app.router.add_post("/", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+
+async def call_times():
+    # (seconds, imported modules) of CALL_SCRIPT, best of IMPORT_RUNS
+    node, url = await start_stub_node()
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(SCRIPTS_DIR),
+        "STARKNET_NETWORK": "devnet",
+        "DEVNET_RPC_URLS": url,
+    }
+    runs = []
+    try:
+        for _ in range(IMPORT_RUNS):
+            process = await asyncio.create_subprocess_exec(
+                sys.executable,
+                "-c",
+                CALL_SCRIPT,
+                cwd=SCRIPTS_DIR.parent,
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            stdout, stderr = await process.communicate()
+            if process.returncode != 0:
+                raise RuntimeError(stderr.decode().strip().splitlines()[-1])
+            runs.append(json.loads(stdout))
+    finally:
+        await node.cleanup()
+    best = min(runs, key=lambda run: run["elapsed"])
+    return best["elapsed"], best["modules"]
+
+
+def heavy_imports(times):
+    return sorted(
+        name
+        for name in times
+        if any(name == heavy or name.startswith(f"{heavy}.") for heavy in HEAVY_MODULES)
+    )
+
+
+# %% Main
+def main():
+    failures = 0
+    for module in LIGHT_MODULES + OTHER_MODULES:
+        try:
+            runs = [import_times(module) for _ in range(IMPORT_RUNS)]
+        except RuntimeError as e:
+            failures += 1
+            logger.error(f"❌ {module} failed to import: {e}")
+            continue
+        elapsed = min(times[module] for times in runs) / 1000
+        heavy = heavy_imports(runs[0])
+        message = f"{module}: {elapsed:.1f}ms, {len(runs[0])} modules"
+        if module not in LIGHT_MODULES:
+            logger.info(f"ℹ️  {message}")
+        elif heavy:
+            failures += 1
+            logger.error(f"❌ {message}, imports {', '.join(heavy[:5])}")
+        elif IMPORT_BUDGET_MS and elapsed > IMPORT_BUDGET_MS:
+            failures += 1
+            logger.error(f"❌ {message}, over {IMPORT_BUDGET_MS:.0f}ms")
+        else:
+            logger.info(f"✅ {message}")
+
+    # importing is not enough, the read path must not build the gateway client
+    try:
+        elapsed, modules = asyncio.run(call_times())
+    except RuntimeError as e:
+        failures += 1
+        logger.error(f"❌ call_v0 failed: {e}")
+    else:
+        heavy = heavy_imports(modules)
+        message = f"call_v0: {elapsed * 1000:.1f}ms, {len(modules)} modules"
+        if heavy:
+            failures += 1
+            logger.error(f"❌ {message}, imports {', '.join(heavy[:5])}")
+        elif CALL_BUDGET_MS and elapsed * 1000 > CALL_BUDGET_MS:
+            failures += 1
+            logger.error(f"❌ {message}, over {CALL_BUDGET_MS:.0f}ms")
+        else:
+            logger.info(f"✅ {message}")
+    sys.exit(1 if failures else 0)
+
+
+# %% Run
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# %% Imports
+import logging
+import os
+import random
+import sys
+import time
+
+from starknet_py.net.account.account import (
+    _execute_payload_serializer,
+    _execute_payload_serializer_v2,
+    _merge_calls,
+    _parse_calls_v2,
+)
+from starknet_py.net.client_models import Call
+from starknet_py.serialization.factory import serializer_for_function_v1
+
+from utils.bisection import AUTO_RENEWAL, get_function_abi, serialize_batch_renew
+from utils.calldata import SELECTORS, encode_batch_renew, encode_execute
+from utils.renewal import Renewal, batch_renew_calldata
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+CHECK_BATCH_SIZE = int(os.getenv("CHECK_BATCH_SIZE", 5000))
+
+
+def random_renewals(count):
+    return [
+        Renewal(
+            random.randrange(2**251),
+            random.randrange(2**251),
+            random.randrange(2**256),
+            random.randrange(2**256),
+            random.randrange(2**251),
+        )
+        for _ in range(count)
+    ]
+
+
+def check_batch_renew(renewals):
+    # encoded with the columns, decoded with the ABI serializer of get_abi
+    calldata = batch_renew_calldata(renewals)
+    if calldata != serialize_batch_renew(renewals):
+        return "calldata differs from the ABI serializer"
+    function = get_function_abi(AUTO_RENEWAL, "batch_renew")
+    decoded = serializer_for_function_v1(function).inputs_serializer.deserialize(
+        calldata
+    )
+    columns = [
+        [renewal[i] for renewal in renewals] for i in range(len(Renewal._fields))
+    ]
+    if [list(getattr(decoded, name)) for name in function.inputs] != columns:
+        return "decoded columns differ from the renewals"
+    return None
+
+
+def check_execute(calls):
+    v1 = _execute_payload_serializer_v2.serialize({"calls": _parse_calls_v2(calls)})
+    if encode_execute(calls, cairo_version=1) != v1:
+        return "cairo 1 __execute__ calldata differs from the account"
+    call_array, calldata = _merge_calls(calls)
+    v0 = _execute_payload_serializer.serialize(
+        {"call_array": call_array, "calldata": calldata}
+    )
+    if encode_execute(calls, cairo_version=0) != v0:
+        return "cairo 0 __execute__ calldata differs from the account"
+    return None
+
+
+# %% Main
+def main():
+    errors = []
+    for size in (0, 1, 2, 65, CHECK_BATCH_SIZE):
+        error = check_batch_renew(random_renewals(size))
+        if error:
+            errors.append(f"batch_renew of {size}: {error}")
+    calls = [
+        Call(
+            to_addr=random.randrange(2**251),
+            selector=SELECTORS["batch_renew"],
+            calldata=batch_renew_calldata(random_renewals(size)),
+        )
+        for size in (1, 3, 10)
+    ]
+    error = check_execute(calls)
+    if error:
+        errors.append(f"multicall: {error}")
+
+    renewals = random_renewals(CHECK_BATCH_SIZE)
+    columns = list(zip(*renewals))
+    start = time.perf_counter()
+    encode_batch_renew(*columns)
+    encoded = time.perf_counter() - start
+    start = time.perf_counter()
+    serialize_batch_renew(renewals)
+    serialized = time.perf_counter() - start
+    logger.info(
+        f"ℹ️  {CHECK_BATCH_SIZE} renewals encoded in {encoded * 1000:.1f}ms, "
+        f"{serialized * 1000:.1f}ms through the ABI serializer"
+    )
+
+    for error in errors:
+        logger.error(f"❌ {error}")
+    if not errors:
+        logger.info("✅ Calldata matches the ABI and account serializers")
+    sys.exit(1 if errors else 0)
+
+
+# %% Run
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# %% Imports
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+from utils.emulator import AutoRenewalEmulator, RevertError
+from utils.renewal import Renewal
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Hand transcription of scenarios of src/tests/test_renewals.cairo, the Cairo
+# suite doesn't read it. Scenario names and constants are checked against the
+# Cairo sources, steps have to be kept in sync by hand.
+FIXTURES = Path(__file__).parent / "fixtures" / "renewals.json"
+CAIRO_TESTS = Path(__file__).parent.parent / "src" / "tests"
+# fn NAME() -> type { body } of src/tests/constants.cairo
+CAIRO_CONSTANT = re.compile(r"fn (\w+)\(\) -> [\w:]+ \{\s*([^{}]*?)\s*\}")
+EMULATOR_PAIRS = int(os.getenv("EMULATOR_PAIRS", 1_000_000))
+
+
+def run_scenario(scenario, constants, prices):
+    # values are ints, names of constants or lists of them to add up
+    def value(raw):
+        if isinstance(raw, list):
+            return sum(value(term) for term in raw)
+        return constants[raw] if isinstance(raw, str) else raw
+
+    def renewal(step):
+        return Renewal(
+            value(step["domain"]),
+            value(step["renewer"]),
+            value(step["domain_price"]),
+            value(step["tax_price"]),
+            value(step["metadata"]),
+        )
+
+    emulator = AutoRenewalEmulator(
+        admin=constants["ADMIN"], whitelisted_renewer=constants["ADMIN"]
+    )
+    now = 0
+    for i, step in enumerate(scenario["steps"]):
+        now = value(step.get("at", now))
+        action = step["action"]
+        try:
+            if action == "buy":
+                emulator.set_expiry(value(step["domain"]), now + 86400 * step["days"])
+            elif action == "enable_renewals":
+                emulator.enable_renewals(
+                    value(step["caller"]),
+                    value(step["domain"]),
+                    value(step["allowance"]),
+                    value(step["meta_hash"]),
+                )
+            elif action == "disable_renewals":
+                emulator.disable_renewals(value(step["caller"]), value(step["domain"]))
+            elif action == "renew":
+                emulator.renew(
+                    value(step["caller"]),
+                    renewal(step),
+                    now,
+                    prices.get(value(step["domain"])),
+                )
+            elif action in ("batch_renew", "batch_renew_aggregated"):
+                getattr(emulator, action)(
+                    value(step["caller"]),
+                    [renewal(entry) for entry in step["renewals"]],
+                    now,
+                    prices,
+                )
+            elif action == "toggle_off":
+                emulator.toggle_off(value(step["caller"]))
+            elif action == "update_whitelisted_renewer":
+                emulator.update_whitelisted_renewer(
+                    value(step["caller"]), value(step["whitelisted_renewer"])
+                )
+            elif action == "assert_allowance":
+                key = (value(step["renewer"]), value(step["domain"]))
+                assert emulator.allowances.get(key, 0) == value(step["equals"])
+            elif action == "assert_expiry":
+                expiry = emulator.expiries[value(step["domain"])]
+                assert "equals" not in step or expiry == value(step["equals"])
+                assert "at_least" not in step or expiry >= value(step["at_least"])
+                assert "below" not in step or expiry < value(step["below"])
+            elif action == "assert_tax_collected":
+                assert emulator.tax_collected == value(step["equals"])
+            else:
+                raise ValueError(f"Unknown action {action}")
+        except RevertError as e:
+            if str(e) != step.get("reverts"):
+                return f"step {i} ({action}) reverted with '{e}'"
+            continue
+        except AssertionError:
+            return f"step {i} ({action}) failed"
+        if "reverts" in step:
+            return f"step {i} ({action}) should revert with '{step['reverts']}'"
+    return None
+
+
+def cairo_constants():
+    # constants of src/tests/constants.cairo which are literals, addresses or
+    # arithmetic on literals
+    constants = {}
+    source = (CAIRO_TESTS / "constants.cairo").read_text()
+    for name, body in CAIRO_CONSTANT.findall(source):
+        body = re.sub(r"starknet::contract_address_const::<(\w+)>\(\)", r"\1", body)
+        if re.fullmatch(r"[0-9a-fA-Fx\s()+*-]+", body):
+            constants[name] = eval(body, {"__builtins__": {}})
+    return constants
+
+
+def check_transcription(fixtures, constants):
+    # errors of the fixtures which drifted from the Cairo sources
+    tests = set(
+        re.findall(
+            r"fn (test_\w+)\(", (CAIRO_TESTS / "test_renewals.cairo").read_text()
+        )
+    )
+    errors = [
+        f"{scenario['name']} is not a test of test_renewals.cairo"
+        for scenario in fixtures["scenarios"]
+        if scenario["name"] not in tests
+    ]
+    for name, value in cairo_constants().items():
+        if name in constants and constants[name] != value:
+            errors.append(f"{name} is {constants[name]}, {value} in constants.cairo")
+    return errors
+
+
+def bench_renewable(pairs):
+    # random pairs spread over two years of expiries and last renewals
+    now = 2 * 86400 * 365
+    emulator = AutoRenewalEmulator()
+    for i in range(pairs):
+        renewer, domain = random.randrange(1, 1000), i + 1
+        emulator.enable_renewals(renewer, domain, random.randrange(2) * 10**18)
+        emulator.last_renewals[(renewer, domain)] = random.randrange(now)
+        emulator.set_expiry(domain, random.randrange(2 * now))
+    start = time.perf_counter()
+    renewals = emulator.renewable(now, lambda domain: 10**16)
+    return len(renewals), time.perf_counter() - start
+
+
+# %% Main
+def main():
+    fixtures = json.load(open(FIXTURES))
+    constants = {
+        name: int(value, 16) if isinstance(value, str) else value
+        for name, value in fixtures["constants"].items()
+    }
+    prices = {
+        constants[domain]: constants[price]
+        for domain, price in fixtures["prices"].items()
+    }
+    failures = 0
+    for error in check_transcription(fixtures, constants):
+        failures += 1
+        logger.error(f"❌ {error}")
+    for scenario in fixtures["scenarios"]:
+        error = run_scenario(scenario, constants, prices)
+        if error is None:
+            logger.info(f"✅ {scenario['name']}")
+        else:
+            failures += 1
+            logger.error(f"❌ {scenario['name']}: {error}")
+
+    if EMULATOR_PAIRS:
+        count, elapsed = bench_renewable(EMULATOR_PAIRS)
+        logger.info(
+            f"ℹ️  {count}/{EMULATOR_PAIRS} pairs renewable, found in {elapsed:.2f}s"
+        )
+    sys.exit(1 if failures else 0)
+
+
+# %% Run
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# %% Imports
+import logging
+import sys
+import time
+from asyncio import gather, run, sleep
+
+from aiohttp import web
+from starknet_py.net.client_errors import ClientError
+
+from utils.failover import (
+    CIRCUIT_OPEN,
+    FAILOVERS,
+    HEDGED_READS,
+    FailoverClient,
+    is_node_failure,
+)
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+HOST = "127.0.0.1"
+NETWORK = "stub"
+
+
+class StubNode:
+    # JSON-RPC node answering blockNumber with its answer after delay seconds,
+    # failing with an HTTP 500 while failing is set and with a JSON-RPC error
+    # for any other method
+    def __init__(self, answer):
+        self.answer = answer
+        self.delay = 0
+        self.failing = False
+        self.requests = 0
+        self.runner = None
+        self.url = None
+
+    async def handle(self, request):
+        payload = await request.json()
+        requests = payload if isinstance(payload, list) else [payload]
+        self.requests += len(requests)
+        await sleep(self.delay)
+        if self.failing:
+            return web.Response(status=500, text="Internal Server Error")
+        responses = [
+            (
+                {"jsonrpc": "2.0", "id": r["id"], "result": self.answer}
+                if r["method"] == "starknet_blockNumber"
+                else {
+                    "jsonrpc": "2.0",
+                    "id": r["id"],
+                    "error": {"code": 20, "message": "Contract not found"},
+                }
+            )
+            for r in requests
+        ]
+        return web.json_response(
+            responses if isinstance(payload, list) else responses[0]
+        )
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, HOST, 0).start()
+        self.url = f"http://{HOST}:{self.runner.addresses[0][1]}"
+        return self
+
+
+async def block_number(client):
+    return await client.call(method_name="blockNumber", params={})
+
+
+def check(name, condition):
+    if condition:
+        logger.info(f"✅ {name}")
+    else:
+        logger.error(f"❌ {name}")
+    return 0 if condition else 1
+
+
+# %% Main
+async def main():
+    nodes = await gather(*(StubNode(answer).start() for answer in (1, 2, 3)))
+    first, second, third = nodes
+    client = FailoverClient(
+        [node.url for node in nodes],
+        network=NETWORK,
+        min_samples=5,
+        default_hedge_delay=0.05,
+        failure_threshold=3,
+        reset_timeout=0.3,
+    )
+    labels = {"network": NETWORK}
+    failures = 0
+
+    # every node answers quickly, reads spread by latency without any hedging
+    results = [await block_number(client) for _ in range(30)]
+    failures += check("reads answered", set(results) <= {1, 2, 3})
+    failures += check(
+        "no hedging while the nodes are fast",
+        all(HEDGED_READS.get(**labels, url=node.url) == 0 for node in nodes),
+    )
+
+    # the fastest node slows down, reads are hedged to another one
+    fastest = next(e for e in client.endpoints if e is client._pick())
+    slow = next(node for node in nodes if node.url == fastest.url)
+    slow.delay = 1
+    start = time.perf_counter()
+    result = await block_number(client)
+    elapsed = time.perf_counter() - start
+    failures += check(
+        "slow node hedged",
+        result != slow.answer
+        and elapsed < 0.5
+        and HEDGED_READS.get(**labels, url=slow.url) == 1,
+    )
+    slow.delay = 0
+    await sleep(1)
+
+    # a failing node trips its breaker and stops receiving requests
+    for node in nodes:
+        node.delay = 0.01 if node is first else 0.05
+    for endpoint in client.endpoints:
+        endpoint.latencies.clear()
+    first.failing = True
+    results = [await block_number(client) for _ in range(5)]
+    failures += check("reads failed over", set(results) <= {2, 3})
+    failures += check("failovers counted", FAILOVERS.get(**labels, url=first.url) == 3)
+    failures += check(
+        "breaker open",
+        client.endpoints[0].breaker.state == "open"
+        and CIRCUIT_OPEN.get(**labels, url=first.url) == 1,
+    )
+    requests = first.requests
+    await gather(*(block_number(client) for _ in range(10)))
+    failures += check("open node skipped", first.requests == requests)
+
+    # once reset_timeout has passed, a successful trial closes the breaker
+    first.failing = False
+    await sleep(0.3)
+    result = await block_number(client)
+    failures += check(
+        "breaker closed after a trial",
+        result == first.answer
+        and client.endpoints[0].breaker.state == "closed"
+        and CIRCUIT_OPEN.get(**labels, url=first.url) == 0,
+    )
+
+    # a JSON-RPC error is the answer of a healthy node
+    requests = sum(node.requests for node in nodes)
+    try:
+        await client.call(
+            method_name="call",
+            params={"request": {"contract_address": "0x1"}, "block_id": "latest"},
+        )
+        error = None
+    except ClientError as e:
+        error = e
+    failures += check(
+        "JSON-RPC errors raised without failover",
+        error is not None
+        and not is_node_failure(error)
+        and sum(node.requests for node in nodes) == requests + 1
+        and all(e.breaker.state == "closed" for e in client.endpoints),
+    )
+
+    # a node which stalls times out and fails over like a failing one
+    stalled = await StubNode(4).start()
+    stalled.delay = 2
+    stalled_client = FailoverClient(
+        [stalled.url, second.url],
+        network=NETWORK,
+        default_hedge_delay=10,
+        failure_threshold=1,
+        timeout=0.3,
+    )
+    start = time.perf_counter()
+    result = await block_number(stalled_client)
+    elapsed = time.perf_counter() - start
+    failures += check(
+        "stalled node timed out",
+        result == second.answer
+        and elapsed < 1
+        and FAILOVERS.get(**labels, url=stalled.url) == 1
+        and stalled_client.endpoints[0].breaker.state == "open",
+    )
+
+    await gather(client.close(), stalled_client.close())
+    await gather(*(node.runner.cleanup() for node in [*nodes, stalled]))
+    sys.exit(1 if failures else 0)
+
+
+# %% Run
+if __name__ == "__main__":
+    run(main())
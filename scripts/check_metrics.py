@@ -0,0 +1,206 @@
+# %% Imports
+import logging
+import sys
+from asyncio import gather, run, sleep
+
+import aiohttp
+from aiohttp import web
+from starknet_py.net.client_errors import ClientError
+
+from utils.context import get_context
+from utils.metrics import (
+    CALL_ERRORS,
+    CALL_SECONDS,
+    CALLS_IN_FLIGHT,
+    instrument_client,
+    instrumented,
+    start_metrics_server,
+)
+from utils.rpc import RpcClient
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+HOST = "127.0.0.1"
+NETWORK = "stub"
+
+
+async def start_stub_node():
+    # JSON-RPC node answering blockNumber after 50ms and failing everything else,
+    # its feeder gateway answers call_contract and is unavailable otherwise
+    async def feeder_gateway(request):
+        if request.match_info["method"] != "call_contract":
+            return web.Response(status=503, text="Service Unavailable")
+        return web.json_response({"result": ["0x2a"]})
+
+    async def handle(request):
+        payload = await request.json()
+        requests = payload if isinstance(payload, list) else [payload]
+        await sleep(0.05)
+        responses = [
+            (
+                {"jsonrpc": "2.0", "id": r["id"], "result": 42}
+                if r["method"] == "starknet_blockNumber"
+                else {
+                    "jsonrpc": "2.0",
+                    "id": r["id"],
+                    "error": {"code": 20, "message": "Contract not found"},
+                }
+            )
+            for r in requests
+        ]
+        return web.json_response(
+            responses if isinstance(payload, list) else responses[0]
+        )
+
+    app = web.Application()
+    app.router.add_post("/", handle)
+    app.router.add_route("*", "/feeder_gateway/{method}", feeder_gateway)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, 0).start()
+    return runner, runner.addresses[0][1]
+
+
+@instrumented
+async def invoke(contract_name, function_name, address=None, fail=False, context=None):
+    # stands for the helpers of utils.starknet
+    await sleep(0.01)
+    if fail:
+        raise ValueError("Invoke failed")
+
+
+async def scrape(port):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"http://{HOST}:{port}/metrics") as response:
+            return response.headers["Content-Type"], await response.text()
+
+
+def parse(text):
+    # sample lines to their value, comments checked on the way
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            assert line.split()[1] in ("HELP", "TYPE"), line
+            continue
+        name, value = line.rsplit(" ", 1)
+        samples[name] = float(value)
+    return samples
+
+
+def check(name, condition):
+    if condition:
+        logger.info(f"✅ {name}")
+    else:
+        logger.error(f"❌ {name}")
+    return 0 if condition else 1
+
+
+# %% Main
+async def main():
+    node, node_port = await start_stub_node()
+    client = RpcClient(f"http://{HOST}:{node_port}", network=NETWORK)
+    labels = {"method": "starknet_blockNumber", "contract": "", "network": NETWORK}
+    call_labels = {"method": "starknet_call", "contract": "0x1", "network": NETWORK}
+
+    # concurrent reads go out in one batch, each one is timed
+    results = await gather(
+        *(client.call(method_name="blockNumber", params={}) for _ in range(10))
+    )
+    try:
+        await client.call(
+            method_name="call",
+            params={"request": {"contract_address": "0x1"}, "block_id": "latest"},
+        )
+    except ClientError:
+        pass
+    await invoke("auto_renew_contract_AutoRenewal", "batch_renew", 1)
+    try:
+        await invoke("auto_renew_contract_AutoRenewal", "batch_renew", 1, fail=True)
+    except ValueError:
+        pass
+
+    # the gateway client of the contexts, as used by the accounts
+    from starknet_py.net.client_models import Call
+    from starknet_py.net.gateway_client import GatewayClient
+
+    gateway = instrument_client(
+        GatewayClient(
+            net={
+                "feeder_gateway_url": f"http://{HOST}:{node_port}/feeder_gateway",
+                "gateway_url": f"http://{HOST}:{node_port}/gateway",
+            }
+        ),
+        NETWORK,
+    )
+    gateway_result = await gateway.call_contract(
+        Call(to_addr=1, selector=2, calldata=[]), block_number="latest"
+    )
+    try:
+        await gateway.get_block(block_number="latest")
+    except ClientError:
+        pass
+
+    metrics = await start_metrics_server(0, HOST)
+    metrics_port = metrics.addresses[0][1]
+    content_type, text = await scrape(metrics_port)
+    samples = parse(text)
+    await client.close()
+    await metrics.cleanup()
+    await node.cleanup()
+
+    failures = 0
+    failures += check("reads answered", results == [42] * 10)
+    failures += check("Prometheus content type", "version=0.0.4" in content_type)
+    failures += check("reads counted", CALL_SECONDS.get(**labels) == 10)
+    bucket = (
+        'starknet_call_duration_seconds_bucket{method="starknet_blockNumber",'
+        f'contract="",network="{NETWORK}",le="0.025"}}'
+    )
+    inf_bucket = bucket.replace('le="0.025"', 'le="+Inf"')
+    failures += check(
+        "latency in the histogram buckets",
+        samples.get(bucket) == 0 and samples.get(inf_bucket) == 10,
+    )
+    failures += check(
+        "node errors counted",
+        CALL_ERRORS.get(**call_labels, error="ClientError") == 1,
+    )
+    invoke_labels = {
+        "method": "invoke:batch_renew",
+        "contract": "0x1",
+        "network": get_context().name,
+    }
+    failures += check(
+        "helpers timed and their errors counted",
+        CALL_SECONDS.get(**invoke_labels) == 2
+        and CALL_ERRORS.get(**invoke_labels, error="ValueError") == 1,
+    )
+    failures += check(
+        "gateway calls timed with the same labels",
+        gateway_result == [42]
+        and CALL_SECONDS.get(
+            method="gateway_call_contract", contract="0x1", network=NETWORK
+        )
+        == 1
+        and CALL_ERRORS.get(
+            method="gateway_get_block", network=NETWORK, error="ClientError"
+        )
+        == 1,
+    )
+    failures += check(
+        "nothing left in flight",
+        all(
+            value == 0
+            for name, value in samples.items()
+            if name.startswith("starknet_calls_in_flight")
+        )
+        and CALLS_IN_FLIGHT.get(**labels) == 0,
+    )
+    sys.exit(1 if failures else 0)
+
+
+# %% Run
+if __name__ == "__main__":
+    run(main())
@@ -0,0 +1,143 @@
+# %% Imports
+import logging
+import sys
+from asyncio import run, wait_for
+from types import SimpleNamespace
+
+from starknet_py.net.client_models import (
+    TransactionExecutionStatus,
+    TransactionFinalityStatus,
+    TransactionStatus,
+)
+from starknet_py.transaction_errors import TransactionNotReceivedError
+
+from utils.nonce import NonceManager
+from utils.receipts import ReceiptTracker
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class StubChain:
+    # Sequencer of a single account: each new block includes the transactions
+    # of the mempool which follow the account nonce. Transactions whose nonce
+    # is in drop are lost the first time they are sent.
+    def __init__(self, drop=()):
+        self.nonce = 0
+        self.mempool = {}
+        self.drop = set(drop)
+        self.blocks = []
+        self.sent = []
+
+    async def send_transaction(self, transaction):
+        self.sent.append(transaction.nonce)
+        tx_hash = 0x1000 + len(self.sent)
+        if transaction.nonce in self.drop:
+            self.drop.discard(transaction.nonce)
+        else:
+            self.mempool[transaction.nonce] = tx_hash
+        return SimpleNamespace(transaction_hash=tx_hash)
+
+    def _receipt(self, tx_hash):
+        return SimpleNamespace(
+            transaction_hash=tx_hash,
+            events=[],
+            l2_to_l1_messages=[],
+            execution_status=TransactionExecutionStatus.SUCCEEDED,
+            finality_status=TransactionFinalityStatus.ACCEPTED_ON_L2,
+            actual_fee=0,
+            revert_error=None,
+            execution_resources=None,
+            transaction_index=0,
+        )
+
+    async def get_block(self, block_number):
+        if block_number == "pending":
+            return SimpleNamespace(block_number=None, transaction_receipts=[])
+        if block_number != "latest":
+            return self.blocks[block_number]
+        included = []
+        while self.nonce in self.mempool:
+            included.append(self._receipt(self.mempool.pop(self.nonce)))
+            self.nonce += 1
+        number = len(self.blocks)
+        self.blocks.append(
+            SimpleNamespace(
+                block_number=number,
+                block_hash=number + 1,
+                parent_block_hash=number,
+                transaction_receipts=included,
+            )
+        )
+        return self.blocks[-1]
+
+    async def get_transaction_receipt(self, tx_hash):
+        status = (
+            TransactionStatus.RECEIVED
+            if tx_hash in self.mempool.values()
+            else TransactionStatus.NOT_RECEIVED
+        )
+        return SimpleNamespace(status=status, execution_status=None, block_number=None)
+
+
+class StubAccount:
+    def __init__(self, chain):
+        self.address = 0x1
+        self.client = chain
+
+    async def get_nonce(self, block_number=None):
+        return self.client.nonce
+
+
+async def sign(nonce, max_fee):
+    return SimpleNamespace(nonce=nonce, max_fee=max_fee)
+
+
+def check(name, condition):
+    if condition:
+        logger.info(f"✅ {name}")
+    else:
+        logger.error(f"❌ {name}")
+    return 0 if condition else 1
+
+
+# %% Main
+async def main():
+    chain = StubChain(drop=[1])
+    account = StubAccount(chain)
+    tracker = ReceiptTracker(chain, interval=0.01, timeout=0.5, lookback=3)
+    manager = NonceManager(account, tracker)
+    failures = 0
+
+    _, first = await manager.submit(sign, max_fee=1)
+    _, dropped = await manager.submit(sign, max_fee=1)
+    receipt = await wait_for(first, 5)
+    failures += check("first transaction accepted", receipt.block_number is not None)
+
+    try:
+        await wait_for(dropped, 5)
+        error = None
+    except TransactionNotReceivedError as e:
+        error = e
+    failures += check(
+        "dropped transaction not received",
+        isinstance(error, TransactionNotReceivedError),
+    )
+    failures += check("nonce resynced to the chain", manager.nonce == chain.nonce == 1)
+
+    # the next transaction takes the dropped nonce instead of waiting behind it
+    _, refill = await manager.submit(sign, max_fee=1)
+    receipt = await wait_for(refill, 5)
+    failures += check(
+        "gap filled",
+        chain.sent == [0, 1, 1]
+        and receipt.block_number is not None
+        and chain.nonce == 2,
+    )
+    sys.exit(1 if failures else 0)
+
+
+# %% Run
+if __name__ == "__main__":
+    run(main())
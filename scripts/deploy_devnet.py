@@ -1,11 +1,15 @@
 # %% Imports
 import logging
+import os
 from asyncio import run
 
-from starknet_py.hash.selector import get_selector_from_name
-from starknet_py.net.client_models import Call
-
-from utils.constants import COMPILED_CONTRACTS_DEVNET, ETH_TOKEN_ADDRESS, COMPILED_CONTRACTS_DEVNET_V0
+from utils.constants import (
+    COMPILED_CONTRACTS_DEVNET,
+    ETH_TOKEN_ADDRESS,
+    COMPILED_CONTRACTS_DEVNET_V0,
+    DEPLOYMENTS_DIR,
+)
+from utils.pipeline import Journal, Pipeline
 from utils.starknet import (
     declare_v2,
     declare,
@@ -14,127 +18,180 @@ from utils.starknet import (
     deploy_with_proxy,
     dump_declarations,
     dump_deployments,
-    get_declarations,
     get_starknet_account,
     invoke,
     invoke_cairo0,
+    call_v0,
     get_eth_contract,
     get_deployments,
+    get_nonce_manager,
+    wait_pending,
 )
 
 logging.basicConfig()
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# tax payments go to account 2 of the devnet
+TAX_ADDRESS_DEVNET = 0x7447084F620BA316A42C72CA5B8EEFB3FE9A05CA5FE6430C65A69ECC4349B3B
+# reruns resume from the journal, DEPLOY_FRESH=1 starts over (eg. after a devnet restart)
+DEPLOY_FRESH = os.getenv("DEPLOY_FRESH", "0") == "1"
 
 
-# %% Main
-async def main():
-    need_deploy = True
-    # %% Declarations
-    account = await get_starknet_account()
-    if need_deploy:
-        logger.info(f"ℹ️  Using account {hex(account.address)} as deployer")
-        
-        # declare autorenewal contract in cairo1
-        class_hash = {
-            contract["contract_name"]: await declare_v2(contract["contract_name"])
-            for contract in COMPILED_CONTRACTS_DEVNET
+def save(results):
+    # declarations.json and deployments.json are kept up to date after each
+    # step, deploy_v2 and deploy_with_proxy read the class hashes from there
+    dump_declarations(
+        {
+            name.removeprefix("declare_"): class_hash
+            for name, class_hash in results.items()
+            if name.startswith("declare_")
         }
-        # declare cairo0 contracts : pricing, naming, identity
-        class_hash_v0 = {
-            contract["contract_name"]: await declare(contract["contract_name"])
-            for contract in COMPILED_CONTRACTS_DEVNET_V0
+    )
+    dump_deployments(
+        {
+            name.removeprefix("deploy_"): deployment
+            for name, deployment in results.items()
+            if name.startswith("deploy_")
         }
-        class_hash = class_hash | class_hash_v0
-        dump_declarations(class_hash)
-
-        class_hash = get_declarations()
-        print('class_hash', class_hash)
+    )
+
+
+async def seed(account, price_domain):
+    logger.info("⏳ Generating dummy data on the devnet...")
+    logger.info("⏳ Buying 10 domains for account...")
+    eth = await get_eth_contract()
+    # transactions are all sent from the same account, nonces keep them
+    # ordered so we don't need to wait for each of them
+    nonce_manager = await get_nonce_manager(account)
+    for x in range(1, 10):
+        # mint Starknet ID
+        await invoke_cairo0("starknetid", "mint", [x], wait=False)
+        # approve naming to spend price_domain on behalf of account
+        deployments = get_deployments()
+        await nonce_manager.invoke(
+            eth.functions["approve"].prepare(
+                int(deployments["naming"]["address"], 16),
+                price_domain,
+            )
+        )
+        # buy domain
+        metadata = (
+            0
+            if x % 2 == 0
+            else 0x683D4A5F8514FEF22D709EA9C55D9419862820318E07A6CF20D49D758CBF06
+        )
+        await invoke_cairo0(
+            "naming", "buy", [x, x, 365, 0, account.address, 0, metadata], wait=False
+        )
 
-        # %% Deployments        
-        deployments = {}
-        deployments["pricing"] = await deploy("pricing", ETH_TOKEN_ADDRESS)
+    logger.info("⏳ Toggling renewal for domains...")
+    for x in range(1, 10):
+        await nonce_manager.invoke(
+            eth.functions["approve"].prepare(
+                int(deployments["auto_renew_contract_AutoRenewal"]["address"], 16),
+                2**128,
+            )
+        )
+        metadata = (
+            0
+            if x % 2 == 0
+            else 0x683D4A5F8514FEF22D709EA9C55D9419862820318E07A6CF20D49D758CBF06
+        )
+        await invoke(
+            "auto_renew_contract_AutoRenewal",
+            "enable_renewals",
+            [x, price_domain, 0, metadata],
+            wait=False,
+        )
 
-        call = Call(
-            to_addr=deployments["pricing"]["address"],
-            selector=get_selector_from_name("compute_buy_price"),
-            calldata=[7, 365],
+    logger.info("⏳ Toggling back some domains...")
+    for x in range(1, 5):
+        await invoke(
+            "auto_renew_contract_AutoRenewal",
+            "disable_renewals",
+            [x, price_domain, 0],
+            wait=False,
         )
-        price_domain = await account.client.call_contract(call)
-        price_domain = price_domain[1]
-        print('domain_price', price_domain)
+    await wait_pending()
+    logger.info("✅ Generation Complete")
+    return True
+
 
-        deployments["starknetid"] = await deploy("starknetid")
-        deployments["naming"] = await deploy_with_proxy("naming", [deployments["starknetid"]["address"], deployments["pricing"]["address"], account.address, 0])
+async def price_of(pricing_address):
+    price = await call_v0(
+        "pricing", "compute_buy_price", [7, 365], address=pricing_address
+    )
+    return price[1]
 
-        # Deploy auto renewal
-        deployments["auto_renew_contract_AutoRenewal"] = await deploy_v2(
+
+# %% Main
+async def main():
+    account = await get_starknet_account()
+    logger.info(f"ℹ️  Using account {hex(account.address)} as deployer")
+    journal = Journal(DEPLOYMENTS_DIR / "pipeline.json")
+    if DEPLOY_FRESH:
+        journal.reset()
+    pipeline = Pipeline(journal, on_step=save)
+
+    # %% Declarations
+    # autorenewal in cairo1, pricing, naming, identity and proxy in cairo0
+    for contract in COMPILED_CONTRACTS_DEVNET:
+        name = contract["contract_name"]
+        pipeline.add(f"declare_{name}", lambda _, name=name: declare_v2(name))
+    for contract in COMPILED_CONTRACTS_DEVNET_V0:
+        name = contract["contract_name"]
+        pipeline.add(f"declare_{name}", lambda _, name=name: declare(name))
+
+    # %% Deployments
+    pipeline.add(
+        "deploy_pricing",
+        lambda _: deploy("pricing", ETH_TOKEN_ADDRESS),
+        ["declare_pricing"],
+    )
+    pipeline.add(
+        "deploy_starknetid", lambda _: deploy("starknetid"), ["declare_starknetid"]
+    )
+    pipeline.add(
+        "deploy_naming",
+        lambda results: deploy_with_proxy(
+            "naming",
+            [
+                results["deploy_starknetid"]["address"],
+                results["deploy_pricing"]["address"],
+                account.address,
+                0,
+            ],
+        ),
+        ["declare_proxy", "declare_naming", "deploy_starknetid", "deploy_pricing"],
+    )
+    pipeline.add(
+        "deploy_auto_renew_contract_AutoRenewal",
+        lambda results: deploy_v2(
             "auto_renew_contract_AutoRenewal",
-            deployments["naming"]["address"],
+            results["deploy_naming"]["address"],
             ETH_TOKEN_ADDRESS,
-            0x7447084f620ba316a42c72ca5b8eefb3fe9a05ca5fe6430c65a69ecc4349b3b, # addr of account 2 on devnet receiving tax payments
-            account.address
-        )
-        print('deployments', deployments)
-        dump_deployments(deployments)
-
-        logger.info("✅ Configuration Complete")
-
-        logger.info("⏳ Generating dummy data on the devnet...")
-        logger.info("⏳ Buying 10 domains for account...")
-        eth = await get_eth_contract()
-        for x in range(1, 10):
-            # mint Starknet ID
-            await invoke_cairo0("starknetid", "mint", [x])
-            # approve naming to spend price_domain on behalf of account
-            deployments = get_deployments()
-            approve = await eth.functions["approve"].invoke(
-                int(deployments["naming"]["address"], 16), 
-                price_domain,
-                max_fee=int(1e17)
-            )
-            await approve.wait_for_acceptance()
-            # buy domain
-            metadata = 0 if x % 2 == 0 else 0x683d4a5f8514fef22d709ea9c55d9419862820318e07a6cf20d49d758cbf06
-            await invoke_cairo0("naming", "buy", [x, x, 365, 0, account.address, 0, metadata])
-
-        logger.info("⏳ Toggling renewal for domains...")
-        for x in range(1, 10):
-            approve = await eth.functions["approve"].invoke(
-                int(deployments["auto_renew_contract_AutoRenewal"]["address"], 16), 
-                2**128,
-                max_fee=int(1e17)
-            )
-            await approve.wait_for_acceptance()
-            metadata = 0 if x % 2 == 0 else 0x683d4a5f8514fef22d709ea9c55d9419862820318e07a6cf20d49d758cbf06
-            await invoke(
-                    "auto_renew_contract_AutoRenewal",
-                    "enable_renewals",
-                    [x, price_domain, 0, metadata]
-            )
+            TAX_ADDRESS_DEVNET,
+            # admin and whitelisted renewer
+            account.address,
+            account.address,
+        ),
+        ["declare_auto_renew_contract_AutoRenewal", "deploy_naming"],
+    )
+    pipeline.add(
+        "price_domain",
+        lambda results: price_of(results["deploy_pricing"]["address"]),
+        ["deploy_pricing"],
+    )
+    pipeline.add(
+        "seed",
+        lambda results: seed(account, results["price_domain"]),
+        ["deploy_auto_renew_contract_AutoRenewal", "price_domain"],
+    )
+
+    await pipeline.run()
+    logger.info("✅ Configuration Complete")
 
-        logger.info("⏳ Toggling back some domains...")
-        for x in range(1, 5):
-            await invoke(
-                    "auto_renew_contract_AutoRenewal",
-                    "disable_renewals",
-                    [x, price_domain, 0]
-            )
-        logger.info("✅ Generation Complete")
-    else:
-        eth = await get_eth_contract()
-        deployments = get_deployments()
-        # Advance time : 31498364
-        # curl -H "Content-Type: application/json"  -d "{ \"time\": 31498364, \"lite\": 1 }" -X POST localhost:5050/increase_time
-        # logger.info("⏳ Renewing some domains...")
-        # for x in range(6, 10):
-        #     await invoke(
-        #             "auto_renew_contract_AutoRenewal",
-        #             "renew",
-        #             [x, account.address, price_domain, 0]
-        #     )
-        logger.info("✅ Generation Complete")
 
 # %% Run
 if __name__ == "__main__":
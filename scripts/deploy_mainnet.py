@@ -3,6 +3,7 @@ import logging
 from asyncio import run
 
 from utils.constants import (
+    AUTO_RENEWAL_STORAGE,
     COMPILED_CONTRACTS,
     ETH_TOKEN_ADDRESS,
     NAMING_ADDRESS_MAINNET,
@@ -17,6 +18,7 @@ from utils.starknet import (
     dump_declarations,
     dump_deployments,
     get_declarations,
+    get_previous_deployments,
     get_starknet_account,
     invoke,
     int_to_uint256,
@@ -46,15 +48,21 @@ async def main():
 
     print("class_hash", class_hash)
 
-    deployments = {}
-    deployments["auto_renew_contract_AutoRenewal"] = await deploy_v2(
-        "auto_renew_contract_AutoRenewal",
-        NAMING_ADDRESS_MAINNET,
-        ETH_TOKEN_ADDRESS,
-        TAX_ADDRESS_MAINNET,
-        ADMIN_ADDRESS_MAINNET,
-        RENEWER_ADDRESS_MAINNET,
+    # a new contract with its own storage, nothing is migrated from the previous one
+    deployments = get_previous_deployments(
+        "auto_renew_contract_AutoRenewal", AUTO_RENEWAL_STORAGE
     )
+    deployments["auto_renew_contract_AutoRenewal"] = {
+        **await deploy_v2(
+            "auto_renew_contract_AutoRenewal",
+            NAMING_ADDRESS_MAINNET,
+            ETH_TOKEN_ADDRESS,
+            TAX_ADDRESS_MAINNET,
+            ADMIN_ADDRESS_MAINNET,
+            RENEWER_ADDRESS_MAINNET,
+        ),
+        "storage": AUTO_RENEWAL_STORAGE,
+    }
     dump_deployments(deployments)
     logger.info("✅ Configuration Complete")
 
@@ -0,0 +1,45 @@
+# %% Imports
+import logging
+import os
+from asyncio import gather, run, sleep
+
+from utils.context import get_contexts
+from utils.indexer import RenewalStore, sync
+from utils.metrics import start_metrics_server
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+INDEX_START_BLOCK = int(os.getenv("INDEX_START_BLOCK", 0))
+INDEX_INTERVAL = int(os.getenv("INDEX_INTERVAL", 30))
+# networks indexed by this process, eg. "mainnet,testnet", STARKNET_NETWORK by
+# default. INDEX_START_BLOCK can be set per network, eg. MAINNET_INDEX_START_BLOCK
+INDEX_NETWORKS = os.getenv("INDEX_NETWORKS")
+# serves the latency, in-flight and error metrics of the node calls on
+# http://127.0.0.1:<METRICS_PORT>/metrics in Prometheus text format, 0 to disable
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+
+
+async def index(context):
+    store = RenewalStore(context=context)
+    start_block = int(context.setting("INDEX_START_BLOCK", INDEX_START_BLOCK))
+    while True:
+        latest = await sync(store, start_block=start_block, context=context)
+        logger.info(
+            f"✅ Synced {context.name} up to block {latest}, "
+            f"{len(store.get_renewals())} renewals enabled"
+        )
+        await sleep(INDEX_INTERVAL)
+
+
+# %% Main
+async def main():
+    if METRICS_PORT:
+        await start_metrics_server(METRICS_PORT)
+    await gather(*(index(context) for context in get_contexts(INDEX_NETWORKS)))
+
+
+# %% Run
+if __name__ == "__main__":
+    run(main())
@@ -0,0 +1,151 @@
+# %% Imports
+import dataclasses
+import logging
+import os
+import time
+from asyncio import run
+
+from starknet_py.net.client_models import Call
+from starknet_py.net.models.transaction import Invoke
+
+from utils.calldata import SELECTORS, U128_MASK, encode_execute, get_selector
+from utils.constants import ETH_TOKEN_ADDRESS
+from utils.devnet import DAY, DOMAIN_BASE, increase_time
+from utils.pricing import get_price_table
+from utils.starknet import get_deployments, get_nonce_manager, get_starknet_account
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+AUTO_RENEWAL = "auto_renew_contract_AutoRenewal"
+# number of identities, domains and renewal flows to create
+LOAD_DOMAINS = int(os.getenv("LOAD_DOMAINS", 1000))
+# domains per multicall, each one being a mint, a buy and an enable_renewals
+LOAD_CHUNK = int(os.getenv("LOAD_CHUNK", 20))
+# identity ids and domains start from there, so that runs don't overlap
+LOAD_OFFSET = int(os.getenv("LOAD_OFFSET", 1_000_000))
+# days the devnet clock is moved forward once everything is bought, 0 to skip.
+# Domains bought for a year are renewable from 30 days before expiry.
+LOAD_ADVANCE_DAYS = int(os.getenv("LOAD_ADVANCE_DAYS", 340))
+# cairo version of the account, devnet predeployed accounts are cairo 0
+LOAD_CAIRO_VERSION = int(os.getenv("LOAD_CAIRO_VERSION", 0))
+
+
+async def sign_multicall(account, calls, nonce, max_fee):
+    # same transaction as account.sign_invoke_transaction, with the __execute__
+    # calldata encoded by utils.calldata instead of the ABI serializers
+    transaction = Invoke(
+        version=1,
+        max_fee=max_fee,
+        signature=[],
+        nonce=nonce,
+        sender_address=account.address,
+        calldata=encode_execute(calls, LOAD_CAIRO_VERSION),
+    )
+    return dataclasses.replace(
+        transaction, signature=account.signer.sign_transaction(transaction)
+    )
+
+
+def domain_calls(account, contracts, identity, domain, price):
+    # a new identity, the domain bought for a year on it, and a renewal flow
+    # allowing twice the price so there is room for the tax
+    allowance = 2 * price
+    return [
+        Call(contracts["starknetid"], get_selector("mint"), [identity]),
+        Call(
+            contracts["naming"],
+            get_selector("buy"),
+            [identity, domain, 365, 0, account.address, 0, 0],
+        ),
+        Call(
+            contracts[AUTO_RENEWAL],
+            SELECTORS["enable_renewals"],
+            [domain, allowance & U128_MASK, allowance >> 128, 0],
+        ),
+    ]
+
+
+def approve_call(spender, amount):
+    return Call(
+        ETH_TOKEN_ADDRESS,
+        SELECTORS["approve"],
+        [spender, amount & U128_MASK, amount >> 128],
+    )
+
+
+# %% Main
+async def main():
+    account = await get_starknet_account()
+    deployments = get_deployments()
+    contracts = {
+        name: int(deployments[name]["address"], 16)
+        for name in ("starknetid", "naming", AUTO_RENEWAL)
+    }
+    identities = [LOAD_OFFSET + i for i in range(LOAD_DOMAINS)]
+    domains = [DOMAIN_BASE + identity for identity in identities]
+    prices, _ = await get_price_table().get_prices(domains)
+    logger.info(
+        f"ℹ️  Creating {LOAD_DOMAINS} domains and renewal flows from "
+        f"{hex(account.address)}, {LOAD_CHUNK} per transaction"
+    )
+
+    nonce_manager = await get_nonce_manager(account)
+    await nonce_manager.resync()
+    # naming takes the price of every domain, the renewals contract is
+    # allowed to spend as much as it needs for the renewals
+    _, receipt = await nonce_manager.submit(
+        lambda nonce, max_fee: sign_multicall(
+            account,
+            [
+                approve_call(contracts["naming"], sum(prices)),
+                approve_call(contracts[AUTO_RENEWAL], 2**128),
+            ],
+            nonce,
+            max_fee,
+        )
+    )
+    await receipt
+
+    chunks = []
+    for start in range(0, LOAD_DOMAINS, LOAD_CHUNK):
+        calls = []
+        for identity, domain, price in zip(
+            identities[start : start + LOAD_CHUNK],
+            domains[start : start + LOAD_CHUNK],
+            prices[start : start + LOAD_CHUNK],
+        ):
+            calls += domain_calls(account, contracts, identity, domain, price)
+        chunks.append(calls)
+
+    # chunks only differ by their ids, the fee of the first one is used for all
+    # of them so that they are sent back to back without any estimate
+    max_fee = await nonce_manager.fees.max_fee(
+        lambda nonce, max_fee: sign_multicall(account, chunks[0], nonce, max_fee),
+        nonce_manager.nonce,
+    )
+    start_time = time.perf_counter()
+    for i, calls in enumerate(chunks):
+        await nonce_manager.submit(
+            lambda nonce, max_fee, calls=calls: sign_multicall(
+                account, calls, nonce, max_fee
+            ),
+            max_fee,
+        )
+        if (i + 1) % 50 == 0:
+            logger.info(f"⏳ {i + 1}/{len(chunks)} transactions sent")
+    await nonce_manager.wait_pending()
+    elapsed = time.perf_counter() - start_time
+    logger.info(
+        f"✅ {LOAD_DOMAINS} domains bought and set to renew in {len(chunks)} "
+        f"transactions, {elapsed:.1f}s ({LOAD_DOMAINS / elapsed:.0f} domains/s)"
+    )
+
+    if LOAD_ADVANCE_DAYS:
+        await increase_time(LOAD_ADVANCE_DAYS * DAY)
+
+
+# %% Run
+if __name__ == "__main__":
+    run(main())
@@ -0,0 +1,148 @@
+# %% Imports
+import json
+import logging
+import os
+import time
+from asyncio import gather, run
+
+from utils.context import get_contexts
+from utils.indexer import RenewalStore, sync
+from utils.metrics import start_metrics_server
+from utils.preflight import preflight
+from utils.pricing import get_price_table
+from utils.renewal import MAX_SIMULATIONS, Renewal, run_keeper
+from utils.scheduler import RenewalScheduler
+from utils.starknet import get_deployments
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# serves the latency, in-flight and error metrics of the node calls on
+# http://127.0.0.1:<METRICS_PORT>/metrics in Prometheus text format, 0 to disable
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+# networks renewed by this process, eg. "mainnet,testnet" (STARKNET_NETWORK by
+# default). Every setting below can be overridden for one network by prefixing
+# it with the network name, eg. MAINNET_RENEW_TAX_BPS.
+RENEW_NETWORKS = os.getenv("RENEW_NETWORKS")
+
+
+class Keeper:
+    # Candidates and settings of the keeper of one network
+    def __init__(self, context):
+        self.context = context
+        self.renewals_file = context.setting(
+            "RENEWALS_FILE", context.deployments_dir / "renewals.json"
+        )
+        self.interval = int(context.setting("RENEW_INTERVAL", 60))
+        self.batch_size = int(context.setting("RENEW_BATCH_SIZE", 0)) or None
+        self.preflight_concurrency = int(context.setting("PREFLIGHT_CONCURRENCY", 500))
+        self.simulate = context.setting("RENEW_SIMULATE", "1") == "1"
+        self.max_simulations = int(
+            context.setting("RENEW_MAX_SIMULATIONS", MAX_SIMULATIONS)
+        )
+        self.tax_bps = int(context.setting("RENEW_TAX_BPS", 0))
+        self.retry_delay = int(context.setting("RENEW_RETRY_DELAY", 3600))
+        self.fee_budget = int(context.setting("RENEW_FEE_BUDGET", 0)) or None
+        self.scheduler = RenewalScheduler()
+        # last block whose events were applied to the scheduler
+        self.scheduled_block = None
+
+    async def check_renewals(self, entries):
+        domain_prices, tax_prices = await get_price_table(self.context).get_prices(
+            [entry["domain"] for entry in entries], tax_bps=self.tax_bps
+        )
+        renewals = [
+            Renewal(**{"domain_price": domain_price, "tax_price": tax_price, **entry})
+            for entry, domain_price, tax_price in zip(
+                entries, domain_prices, tax_prices
+            )
+        ]
+        # preflight reads last renewals with get_renewal_states, deployments
+        # without that view fall back on the indexed DomainRenewed events
+        last_renewals = {}
+        if (self.context.deployments_dir / "indexer.db").exists():
+            last_renewals = {
+                (entry["renewer"], entry["domain"]): entry["last_renewal"]
+                for entry in RenewalStore(context=self.context).get_renewals()
+            }
+        # drop everything which would revert the whole batch
+        return await preflight(
+            renewals,
+            last_renewals,
+            self.preflight_concurrency,
+            context=self.context,
+        )
+
+    async def get_file_candidates(self):
+        # renewals.json holds the entries to renew as a list of objects with the
+        # Renewal fields, values being ints or hex strings. domain_price and
+        # tax_price can be left out, they are then taken from the price table.
+        entries = json.load(open(self.renewals_file))
+        entries = [
+            {key: int(str(value), 0) for key, value in entry.items()}
+            for entry in entries
+        ]
+        return await self.check_renewals(entries)
+
+    async def get_scheduled_candidates(self):
+        # without renewals.json, every enabled renewal of the indexer is
+        # scheduled at the time it becomes renewable and only due ones are checked
+        store = RenewalStore(context=self.context)
+        client = self.context.rpc
+        latest = await sync(store, client, context=self.context)
+        naming = int(get_deployments(self.context)["naming"]["address"], 16)
+        if self.scheduled_block is None:
+            rows = store.get_renewals()
+        else:
+            rows = store.get_renewals(since_block=self.scheduled_block)
+        await self.scheduler.update(rows, client, naming)
+        self.scheduled_block = latest
+
+        now = int(time.time())
+        due = self.scheduler.pop_due(now)
+        # due pairs come back after the retry delay, unless a DomainRenewed
+        # event reschedules them to next year before
+        for renewer, domain, metadata in due:
+            self.scheduler.schedule(renewer, domain, now + self.retry_delay, metadata)
+        logger.info(
+            f"ℹ️  {len(due)} {self.context.name} domains due out of "
+            f"{len(self.scheduler)} scheduled"
+        )
+        if not due:
+            return []
+        return await self.check_renewals(
+            [
+                {"renewer": renewer, "domain": domain, "metadata": metadata}
+                for renewer, domain, metadata in due
+            ]
+        )
+
+    async def get_candidates(self):
+        if os.path.exists(self.renewals_file):
+            return await self.get_file_candidates()
+        return await self.get_scheduled_candidates()
+
+    async def run(self):
+        await run_keeper(
+            self.get_candidates,
+            self.interval,
+            self.batch_size,
+            simulate=self.simulate,
+            fee_budget=self.fee_budget,
+            context=self.context,
+            max_simulations=self.max_simulations,
+        )
+
+
+# %% Main
+async def main():
+    if METRICS_PORT:
+        await start_metrics_server(METRICS_PORT)
+    # keepers of every network share the event loop, RPC connections and caches
+    await gather(*(Keeper(context).run() for context in get_contexts(RENEW_NETWORKS)))
+
+
+# %% Run
+if __name__ == "__main__":
+    run(main())
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import logging
+import re
+from functools import lru_cache
+
+from starknet_py.abi.v2.parser import AbiParser
+from starknet_py.net.client_errors import ClientError
+from starknet_py.net.client_models import Call
+from starknet_py.serialization.factory import serializer_for_function_v1
+
+from utils.calldata import get_selector
+from utils.starknet import get_abi
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+AUTO_RENEWAL = "auto_renew_contract_AutoRenewal"
+# Cairo 1 panics are reported as "0x... ('Short string')" by the sequencer
+FAILURE_REASON = re.compile(r"\('([^']*)'\)")
+# errors of a transaction failing to execute, from the gateway and from JSON-RPC
+# nodes (CONTRACT_ERROR, TRANSACTION_EXECUTION_ERROR). Anything else (rate
+# limits, HTTP errors, outages) says nothing about the batch
+GATEWAY_EXECUTION_ERRORS = ("StarknetErrorCode.TRANSACTION_FAILED",)
+RPC_EXECUTION_ERRORS = (40, 41)
+# reason of the entries left undecided once the simulations of a cycle ran out,
+# they are not sent and come back in the next cycle
+BUDGET_EXHAUSTED = "Simulation budget exhausted"
+
+
+@lru_cache
+def get_function_abi(contract_name, function_name):
+    abi = AbiParser(json.loads(get_abi(contract_name))).parse()
+    for interface in abi.interfaces.values():
+        if function_name in interface.items:
+            return interface.items[function_name]
+    return abi.functions[function_name]
+
+
+def serialize_batch_renew(renewals):
+    # batch_renew takes one span per Renewal field, in the same order
+    function = get_function_abi(AUTO_RENEWAL, "batch_renew")
+    columns = {
+        name: [renewal[i] for renewal in renewals]
+        for i, name in enumerate(function.inputs)
+    }
+    return serializer_for_function_v1(function).serialize(**columns)
+
+
+def get_revert_reason(message):
+    reasons = FAILURE_REASON.findall(message)
+    if reasons:
+        return reasons[0]
+    return message.strip().splitlines()[-1] if message.strip() else "unknown"
+
+
+def is_execution_error(error):
+    if isinstance(error.code, int):
+        return error.code in RPC_EXECUTION_ERRORS
+    return any(code in error.message for code in GATEWAY_EXECUTION_ERRORS)
+
+
+class SimulationBudget:
+    # Simulations left for one renewal cycle, shared by all its batches. Entries
+    # sharing a capacity (eg. the allowance or balance of a renewer) can make
+    # the bisection much longer than O(k log n), this bounds its cost.
+    def __init__(self, simulations):
+        self.left = simulations
+
+    def take(self):
+        if self.left <= 0:
+            return False
+        self.left -= 1
+        return True
+
+
+async def simulate(account, calls, nonce):
+    # Fee estimation runs the whole transaction without sending it, returns the
+    # revert reason or None if it would succeed. Errors which are not a failed
+    # execution are raised, so the cycle fails instead of excluding entries
+    transaction = await account.sign_invoke_transaction(calls, nonce=nonce, max_fee=0)
+    transaction = await account.sign_for_fee_estimate(transaction)
+    try:
+        await account.client.estimate_fee(transaction)
+    except ClientError as e:
+        if not is_execution_error(e):
+            raise
+        return get_revert_reason(e.message)
+    return None
+
+
+async def _bisect(simulate_batch, batch, prefix=()):
+    reason = await simulate_batch([*prefix, *batch])
+    if reason is None:
+        return list(batch), []
+    if len(batch) == 1:
+        return [], [(batch[0], reason)]
+
+    mid = len(batch) // 2
+    (left, left_excluded), (right, right_excluded) = await asyncio.gather(
+        _bisect(simulate_batch, batch[:mid], prefix),
+        _bisect(simulate_batch, batch[mid:], prefix),
+    )
+    if not left_excluded and not right_excluded:
+        # both halves succeed on their own but not together (eg. a renewer
+        # running out of funds), right is checked again on top of left
+        right, right_excluded = await _bisect(
+            simulate_batch, batch[mid:], [*prefix, *batch[:mid]]
+        )
+    return left + right, left_excluded + right_excluded
+
+
+async def find_reverts(account, renewals, address, nonce=None, budget=None):
+    # Splits renewals into the entries batch_renew accepts and the excluded
+    # (renewal, revert reason) pairs, with O(k log n) simulations for k bad
+    # entries. Once the budget is spent, undecided entries are excluded with
+    # BUDGET_EXHAUSTED
+    if nonce is None:
+        nonce = await account.get_nonce()
+
+    async def simulate_batch(batch):
+        if budget is not None and not budget.take():
+            return BUDGET_EXHAUSTED
+        call = Call(
+            to_addr=address,
+            selector=get_selector("batch_renew"),
+            calldata=serialize_batch_renew(batch),
+        )
+        return await simulate(account, call, nonce)
+
+    clean, excluded = list(renewals), []
+    while clean:
+        clean, new_excluded = await _bisect(simulate_batch, clean)
+        excluded += new_excluded
+        if not new_excluded:
+            break
+
+    deferred = sum(reason == BUDGET_EXHAUSTED for _, reason in excluded)
+    if deferred:
+        logger.warning(
+            f"⚠️  {deferred} entries left for the next cycle: {BUDGET_EXHAUSTED}"
+        )
+    for renewal, reason in excluded:
+        if reason != BUDGET_EXHAUSTED:
+            logger.warning(
+                f"⚠️  Excluding {hex(renewal.domain)} of {hex(renewal.renewer)}: {reason}"
+            )
+    return clean, excluded
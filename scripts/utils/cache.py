@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# one cache per client, see get_call_cache
+CALL_CACHES = {}
+
+
+class BlockCache:
+    # Read-through cache of call_contract results keyed by
+    # (block_number, to_addr, selector, calldata). Calls on "latest" are pinned
+    # to the chain head, which is refreshed at most every head_ttl seconds;
+    # entries of older blocks are dropped as soon as the head advances.
+    def __init__(self, client, maxsize=100000, head_ttl=2):
+        self.client = client
+        self.maxsize = maxsize
+        self.head_ttl = head_ttl
+        self.head = None
+        self.hits = 0
+        self.misses = 0
+        self._head_checked = 0
+        self._entries = OrderedDict()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "head": self.head,
+        }
+
+    def _advance(self, block_number):
+        if self.head is not None and block_number <= self.head:
+            return
+        self.head = block_number
+        self._entries = OrderedDict(
+            (key, value)
+            for key, value in self._entries.items()
+            if key[0] >= block_number
+        )
+
+    async def get_head(self):
+        if self.head is None or time.monotonic() - self._head_checked > self.head_ttl:
+            block = await self.client.get_block(block_number="latest")
+            self._head_checked = time.monotonic()
+            self._advance(block.block_number)
+        return self.head
+
+    async def call_contract(self, call, block_number=None):
+        if block_number is None or block_number == "latest":
+            block_number = await self.get_head()
+        elif block_number == "pending":
+            return await self.client.call_contract(call, block_number=block_number)
+        else:
+            self._advance(block_number)
+
+        key = (block_number, call.to_addr, call.selector, tuple(call.calldata))
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            # concurrent identical reads share the same pending request
+            return await asyncio.shield(self._entries[key])
+
+        self.misses += 1
+        future = asyncio.ensure_future(
+            self.client.call_contract(call, block_number=block_number)
+        )
+        self._entries[key] = future
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            # failures are not cached
+            self._entries.pop(key, None)
+            raise
+
+    async def get_block(self, *args, **kwargs):
+        return await self.client.get_block(*args, **kwargs)
+
+
+def get_call_cache(client) -> BlockCache:
+    if id(client) not in CALL_CACHES:
+        CALL_CACHES[id(client)] = BlockCache(client)
+    return CALL_CACHES[id(client)]
@@ -0,0 +1,78 @@
+from functools import lru_cache
+
+from eth_hash.auto import keccak
+
+U128_MASK = (1 << 128) - 1
+MASK_250 = (1 << 250) - 1
+# entry points without a name, whose selector is 0
+DEFAULT_ENTRY_POINTS = ("__default__", "__l1_default__")
+
+
+@lru_cache(maxsize=None)
+def get_selector(function_name):
+    # same as starkware get_selector_from_name (keccak truncated to 250 bits),
+    # without importing cairo-lang
+    if function_name in DEFAULT_ENTRY_POINTS:
+        return 0
+    return int.from_bytes(keccak(function_name.encode("ascii")), "big") & MASK_250
+
+
+# selectors of the entry points called over and over, computed once
+SELECTORS = {
+    name: get_selector(name)
+    for name in (
+        "batch_renew",
+        "batch_renew_aggregated",
+        "renew",
+        "enable_renewals",
+        "disable_renewals",
+        "approve",
+        "transfer",
+    )
+}
+
+
+def encode_batch_renew(domains, renewers, domain_prices, tax_prices, metadatas):
+    # flat calldata of batch_renew: 5 spans, each prefixed by its length, with
+    # u256 prices split into (low, high). Columns are written by slices into a
+    # preallocated list instead of appending felt by felt.
+    columns = (domains, renewers, domain_prices, tax_prices, metadatas)
+    if len({len(column) for column in columns}) != 1:
+        raise ValueError("batch_renew columns must have the same length")
+    n = len(domains)
+    calldata = [n] * (5 + 7 * n)
+    start = 1
+    calldata[start : start + n] = domains
+    start += n + 1
+    calldata[start : start + n] = renewers
+    start += n + 1
+    for prices in (domain_prices, tax_prices):
+        calldata[start : start + 2 * n : 2] = [price & U128_MASK for price in prices]
+        calldata[start + 1 : start + 2 * n : 2] = [price >> 128 for price in prices]
+        start += 2 * n + 1
+    calldata[start : start + n] = metadatas
+    return calldata
+
+
+def encode_execute(calls, cairo_version=1):
+    # __execute__ calldata of a multicall, as the account would build it
+    if cairo_version == 1:
+        calldata = [len(calls)]
+        for call in calls:
+            calldata += [
+                call.to_addr,
+                call.selector,
+                len(call.calldata),
+                *call.calldata,
+            ]
+        return calldata
+
+    # cairo 0 accounts take the call descriptions then all the calldata
+    descriptions, offset = [len(calls)], 0
+    for call in calls:
+        descriptions += [call.to_addr, call.selector, offset, len(call.calldata)]
+        offset += len(call.calldata)
+    calldata = [offset]
+    for call in calls:
+        calldata += call.calldata
+    return descriptions + calldata
@@ -0,0 +1,66 @@
+import hashlib
+import json
+from pathlib import Path
+
+from utils.pipeline import dump_json_atomic
+
+# Class hashes and ABIs of the compiled artifacts, stored by the SHA-256 of
+# the artifact bytes: an unchanged artifact is never parsed nor hashed again,
+# and the starknet_py hashing modules are only imported on a cache miss
+CACHE_DIR = Path("target") / "class_cache"
+
+
+def _cached(kind, artifact, compute, cache_dir=None):
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    content = Path(artifact).read_bytes()
+    path = cache_dir / f"{kind}-{hashlib.sha256(content).hexdigest()}.json"
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        pass
+    entry = compute(content.decode())
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    dump_json_atomic(entry, path)
+    return entry
+
+
+def get_cairo0_class(artifact, cache_dir=None):
+    # {"class_hash", "abi"} of a cairo 0 compiled contract
+    def compute(compiled_contract):
+        from starknet_py.common import create_compiled_contract
+        from starknet_py.hash.class_hash import compute_class_hash
+
+        contract_class = create_compiled_contract(compiled_contract=compiled_contract)
+        return {
+            "class_hash": compute_class_hash(contract_class=contract_class),
+            "abi": json.loads(compiled_contract)["abi"],
+        }
+
+    return _cached("cairo0", artifact, compute, cache_dir)
+
+
+def get_sierra_class(artifact, cache_dir=None):
+    # {"class_hash", "abi"} of a sierra contract class, abi being a json string
+    def compute(compiled_contract):
+        from starknet_py.common import create_sierra_compiled_contract
+        from starknet_py.hash.sierra_class_hash import compute_sierra_class_hash
+
+        sierra_class = create_sierra_compiled_contract(compiled_contract)
+        return {
+            "class_hash": compute_sierra_class_hash(sierra_class),
+            "abi": sierra_class.abi,
+        }
+
+    return _cached("sierra", artifact, compute, cache_dir)
+
+
+def get_casm_class_hash(artifact, cache_dir=None):
+    def compute(compiled_contract):
+        from starknet_py.common import create_casm_class
+        from starknet_py.hash.casm_class_hash import compute_casm_class_hash
+
+        return {
+            "class_hash": compute_casm_class_hash(create_casm_class(compiled_contract))
+        }
+
+    return _cached("casm", artifact, compute, cache_dir)["class_hash"]
@@ -0,0 +1,177 @@
+import numpy as np
+
+# Same rules as AutoRenewal._renew
+RENEWAL_COOLDOWN = 86400 * 364
+EXPIRY_WINDOW = 86400 * 30
+# felt252 and u256 are split into 4 little endian u64 limbs
+LIMBS = 4
+LIMB_BITS = 64
+
+
+def to_limbs(values):
+    buffer = b"".join(value.to_bytes(8 * LIMBS, "big") for value in values)
+    return (
+        np.frombuffer(buffer, dtype=">u8").reshape(-1, LIMBS)[:, ::-1].astype(np.uint64)
+    )
+
+
+def from_limbs(limbs):
+    return sum(int(limb) << (LIMB_BITS * i) for i, limb in enumerate(limbs))
+
+
+def to_keys(renewers, domains):
+    # big endian bytes of renewer then domain, so that byte order is the
+    # numeric order of (renewer, domain) and keys can be binary searched
+    return np.array(
+        [
+            renewer.to_bytes(32, "big") + domain.to_bytes(32, "big")
+            for renewer, domain in zip(renewers, domains)
+        ],
+        dtype="S64",
+    )
+
+
+def _limbs_ge(limbs, other):
+    # limbs >= other row by row, other being limbs of the same shape or of one value
+    other = np.broadcast_to(other, limbs.shape)
+    ge = np.ones(len(limbs), dtype=bool)
+    for i in range(LIMBS):
+        ge = (limbs[:, i] > other[:, i]) | ((limbs[:, i] == other[:, i]) & ge)
+    return ge
+
+
+class RenewalColumns:
+    # Renewal state as fixed width numpy columns sorted by (renewer, domain):
+    # 144 bytes per pair instead of a dict of python ints. Lookups are binary
+    # searches on the key column and eligibility filters are vectorised.
+    def __init__(self):
+        self.keys = np.empty(0, dtype="S64")
+        self.allowances = np.empty((0, LIMBS), dtype=np.uint64)
+        self.meta_hashes = np.empty((0, LIMBS), dtype=np.uint64)
+        self.last_renewals = np.empty(0, dtype=np.uint64)
+        self.expiries = np.empty(0, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def nbytes(self):
+        return sum(
+            column.nbytes
+            for column in (
+                self.keys,
+                self.allowances,
+                self.meta_hashes,
+                self.last_renewals,
+                self.expiries,
+            )
+        )
+
+    @classmethod
+    def from_rows(cls, rows, expiries):
+        # rows are RenewalStore.get_renewals entries, expiries maps domains to
+        # their expiry (see utils.scheduler.read_expiries)
+        columns = cls()
+        columns.update(rows, expiries)
+        return columns
+
+    def _find(self, keys):
+        # indices of keys in the key column, -1 for missing ones
+        indices = np.searchsorted(self.keys, keys)
+        found = indices < len(self.keys)
+        found[found] = self.keys[indices[found]] == keys[found]
+        return np.where(found, indices, -1)
+
+    def update(self, rows, expiries):
+        # overwrites the known pairs and inserts the new ones
+        if not rows:
+            return
+        keys = to_keys(
+            [row["renewer"] for row in rows], [row["domain"] for row in rows]
+        )
+        allowances = to_limbs([row["allowance"] for row in rows])
+        meta_hashes = to_limbs([row["meta_hash"] for row in rows])
+        last_renewals = np.array([row["last_renewal"] for row in rows], dtype=np.uint64)
+        row_expiries = np.array(
+            [expiries.get(row["domain"], 0) for row in rows], dtype=np.uint64
+        )
+
+        # later rows win over earlier ones for the same pair
+        keys, first = np.unique(keys[::-1], return_index=True)
+        order = len(rows) - 1 - first
+        allowances, meta_hashes = allowances[order], meta_hashes[order]
+        last_renewals, row_expiries = last_renewals[order], row_expiries[order]
+
+        indices = self._find(keys)
+        known = indices >= 0
+        for column, values in (
+            (self.allowances, allowances),
+            (self.meta_hashes, meta_hashes),
+            (self.last_renewals, last_renewals),
+            (self.expiries, row_expiries),
+        ):
+            column[indices[known]] = values[known]
+
+        new = ~known
+        if new.any():
+            self.keys = np.concatenate([self.keys, keys[new]])
+            self.allowances = np.concatenate([self.allowances, allowances[new]])
+            self.meta_hashes = np.concatenate([self.meta_hashes, meta_hashes[new]])
+            self.last_renewals = np.concatenate(
+                [self.last_renewals, last_renewals[new]]
+            )
+            self.expiries = np.concatenate([self.expiries, row_expiries[new]])
+            self._sort()
+
+    def _sort(self):
+        order = np.argsort(self.keys, kind="stable")
+        self.keys = self.keys[order]
+        self.allowances = self.allowances[order]
+        self.meta_hashes = self.meta_hashes[order]
+        self.last_renewals = self.last_renewals[order]
+        self.expiries = self.expiries[order]
+
+    def set_expiries(self, expiries):
+        # expiries maps domains to their new expiry, for every renewer
+        if not expiries or not len(self):
+            return
+        domains = np.frombuffer(self.keys.tobytes(), dtype="S32")[1::2]
+        targets = np.array(
+            [domain.to_bytes(32, "big") for domain in expiries], dtype="S32"
+        )
+        values = np.array(list(expiries.values()), dtype=np.uint64)
+        order = np.argsort(targets)
+        targets, values = targets[order], values[order]
+        positions = np.minimum(np.searchsorted(targets, domains), len(targets) - 1)
+        match = targets[positions] == domains
+        self.expiries[match] = values[positions[match]]
+
+    def get(self, renewer, domain):
+        index = self._find(to_keys([renewer], [domain]))[0]
+        return None if index < 0 else self.row(index)
+
+    def row(self, index):
+        key = self.keys[index].ljust(64, b"\0")
+        return {
+            "renewer": int.from_bytes(key[:32], "big"),
+            "domain": int.from_bytes(key[32:], "big"),
+            "allowance": from_limbs(self.allowances[index]),
+            "meta_hash": from_limbs(self.meta_hashes[index]),
+            "last_renewal": int(self.last_renewals[index]),
+            "expiry": int(self.expiries[index]),
+        }
+
+    def eligible(self, now, min_allowance=1):
+        # indices of the pairs _renew would accept at `now` for a total price
+        # of min_allowance, either one value or one per row
+        mask = self.expiries <= now + EXPIRY_WINDOW
+        if now > RENEWAL_COOLDOWN:
+            mask &= self.last_renewals < now - RENEWAL_COOLDOWN
+        else:
+            mask[:] = False
+        if isinstance(min_allowance, int):
+            min_allowance = to_limbs([min_allowance])
+        elif not isinstance(min_allowance, np.ndarray):
+            min_allowance = to_limbs(min_allowance)
+        mask &= _limbs_ge(self.allowances, min_allowance)
+        return np.flatnonzero(mask)
@@ -3,8 +3,6 @@ import os
 from pathlib import Path
 
 from dotenv import load_dotenv
-from starknet_py.net.gateway_client import GatewayClient
-from starknet_py.net.models.chains import StarknetChainId
 
 logging.basicConfig()
 logger = logging.getLogger(__name__)
@@ -14,6 +12,7 @@ load_dotenv()
 NETWORKS = {
     "mainnet": {
         "name": "mainnet",
+        "rpc_url": f"https://starknet-mainnet.infura.io/v3/{os.getenv('INFURA_KEY')}",
         "feeder_gateway_url": "https://alpha-mainnet.starknet.io/feeder_gateway",
         "gateway_url": "https://alpha-mainnet.starknet.io/gateway",
     },
@@ -30,37 +29,29 @@ NETWORKS = {
         "rpc_url": "http://0.0.0.0:5050/rpc",
         "feeder_gateway_url": "http://localhost:5050/feeder_gateway",
         "gateway_url": "http://localhost:5050/gateway",
+        "devnet_url": "http://localhost:5050",
     },
 }
 
-NETWORK = NETWORKS[os.getenv("STARKNET_NETWORK", "devnet")]
-NETWORK["account_address"] = os.environ.get(
-    f"{NETWORK['name'].upper()}_ACCOUNT_ADDRESS"
-)
-if NETWORK["account_address"] is None:
-    logger.warning(
-        f"⚠️ {NETWORK['name'].upper()}_ACCOUNT_ADDRESS not set, defaulting to ACCOUNT_ADDRESS"
-    )
-    NETWORK["account_address"] = os.getenv("ACCOUNT_ADDRESS")
-NETWORK["private_key"] = os.environ.get(f"{NETWORK['name'].upper()}_PRIVATE_KEY")
-if NETWORK["private_key"] is None:
-    logger.warning(
-        f"⚠️  {NETWORK['name'].upper()}_PRIVATE_KEY not set, defaulting to PRIVATE_KEY"
-    )
-    NETWORK["private_key"] = os.getenv("PRIVATE_KEY")
-if NETWORK["name"] == "mainnet":
-    NETWORK["chain_id"] = StarknetChainId.MAINNET
-elif NETWORK["name"] == "testnet2":
-    StarknetChainId.TESTNET2
-else:
-    NETWORK["chain_id"] = StarknetChainId.TESTNET
-
-GATEWAY_CLIENT = GatewayClient(
-    net={
-        "feeder_gateway_url": NETWORK["feeder_gateway_url"],
-        "gateway_url": NETWORK["gateway_url"],
-    }
-)
+# the selected network, its gateway client and deployments directory are
+# only resolved on first access, see utils.context
+CONTEXT_ATTRIBUTES = {
+    "NETWORK": "network",
+    "GATEWAY_CLIENT": "client",
+    "DEPLOYMENTS_DIR": "deployments_dir",
+}
+
+
+def __getattr__(name):
+    if name not in CONTEXT_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from utils.context import get_context
+
+    return getattr(get_context(), CONTEXT_ATTRIBUTES[name])
+
+
+# max fees are the estimated fee times this margin
+FEE_MARGIN = float(os.getenv("FEE_MARGIN", 1.5))
 
 ETH_TOKEN_ADDRESS = 0x49D36570D4E46F48E99674BD3FCC84644DDD6B96F7C741B1562B82F9E004DC7
 ETH_CLASS_HASH = 0x6a22bf63c7bc07effa39a25dfbd21523d211db0100a0afd054d172b81840eaf
@@ -69,15 +60,14 @@ CONTRACTS = {p.stem: p for p in list(SOURCE_DIR.glob("**/*.cairo"))}
 
 BUILD_DIR = Path("target/release")
 BUILD_DIR_V0 = Path("cairo0_abi")
-BUILD_DIR.mkdir(exist_ok=True, parents=True)
-BUILD_DIR_V0.mkdir(exist_ok=True, parents=True)
-DEPLOYMENTS_DIR = Path("deployments") / NETWORK["name"]
-DEPLOYMENTS_DIR.mkdir(exist_ok=True, parents=True)
 
 COMPILED_CONTRACTS = [
     {"contract_name": "auto_renew_contract_AutoRenewal", "is_account_contract": False},
 ]
 
+# storage layout of the AutoRenewal deployments, see get_previous_deployments
+AUTO_RENEWAL_STORAGE = "packed"
+
 COMPILED_CONTRACTS_DEVNET = [
     {"contract_name": "auto_renew_contract_AutoRenewal", "is_account_contract": False},
 ]
@@ -0,0 +1,129 @@
+import logging
+import os
+from functools import cached_property
+from pathlib import Path
+
+from utils.constants import NETWORKS
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# one context per network name, see get_context
+CONTEXTS = {}
+
+
+class NetworkContext:
+    # Settings and clients of one network. Nothing is read, built nor created
+    # before being used: a read-only command never constructs the gateway
+    # client nor imports the starknet_py transaction and hashing modules.
+    # The utils.starknet helpers take a context (the STARKNET_NETWORK one by
+    # default), so that several networks can be driven from the same loop.
+    def __init__(self, name):
+        if name not in NETWORKS:
+            raise ValueError(
+                f"Unknown network {name}, expected one of {list(NETWORKS)}"
+            )
+        self.name = name
+        # one nonce manager per account address, see get_nonce_manager
+        self.nonce_managers = {}
+
+    def setting(self, key, default=None, warn=False):
+        # network specific variable first, eg. DEVNET_PRIVATE_KEY
+        value = os.environ.get(f"{self.name.upper()}_{key}")
+        if value is None:
+            if warn:
+                logger.warning(
+                    f"⚠️  {self.name.upper()}_{key} not set, defaulting to {key}"
+                )
+            value = os.getenv(key, default)
+        return value
+
+    @cached_property
+    def network(self):
+        return {
+            **NETWORKS[self.name],
+            "account_address": self.setting("ACCOUNT_ADDRESS", warn=True),
+            "private_key": self.setting("PRIVATE_KEY", warn=True),
+            # comma separated node urls, the rpc_url of NETWORKS by default
+            "rpc_urls": [
+                url.strip()
+                for url in self.setting(
+                    "RPC_URLS", NETWORKS[self.name]["rpc_url"]
+                ).split(",")
+                if url.strip()
+            ],
+        }
+
+    @cached_property
+    def chain_id(self):
+        from starknet_py.net.models.chains import StarknetChainId
+
+        if self.name == "mainnet":
+            return StarknetChainId.MAINNET
+        return StarknetChainId.TESTNET
+
+    @cached_property
+    def client(self):
+        # every request is timed by utils.metrics, like the JSON-RPC ones
+        from starknet_py.net.gateway_client import GatewayClient
+
+        from utils.metrics import instrument_client
+
+        client = GatewayClient(
+            net={
+                "feeder_gateway_url": self.network["feeder_gateway_url"],
+                "gateway_url": self.network["gateway_url"],
+            }
+        )
+        return instrument_client(client, self.name)
+
+    @cached_property
+    def rpc(self):
+        # RPC clients are shared by url, so are their connection pools. With
+        # several urls, reads are hedged and failed over between the nodes
+        urls = self.network["rpc_urls"]
+        timeout = float(self.setting("RPC_TIMEOUT", 30))
+        if len(urls) == 1:
+            from utils.rpc import get_rpc_client
+
+            return get_rpc_client(urls[0], self.name, timeout)
+
+        from utils.failover import get_failover_client
+
+        return get_failover_client(
+            urls,
+            self.name,
+            hedge_percentile=float(self.setting("RPC_HEDGE_PERCENTILE", 95)),
+            failure_threshold=int(self.setting("RPC_BREAKER_FAILURES", 5)),
+            reset_timeout=float(self.setting("RPC_BREAKER_RESET", 30)),
+            timeout=timeout,
+        )
+
+    @cached_property
+    def receipt_tracker(self):
+        # a single tracker polling new blocks for every account of the network
+        from utils.receipts import ReceiptTracker
+
+        return ReceiptTracker(self.client)
+
+    @cached_property
+    def deployments_dir(self):
+        path = Path("deployments") / self.name
+        path.mkdir(exist_ok=True, parents=True)
+        return path
+
+
+def get_context(name=None) -> NetworkContext:
+    name = name or os.getenv("STARKNET_NETWORK", "devnet")
+    if name not in CONTEXTS:
+        CONTEXTS[name] = NetworkContext(name)
+    return CONTEXTS[name]
+
+
+def get_contexts(names=None):
+    # names is a comma separated list of networks, eg. "mainnet,testnet",
+    # defaulting to STARKNET_NETWORK
+    if not names:
+        return [get_context()]
+    return [get_context(name.strip()) for name in names.split(",") if name.strip()]
@@ -0,0 +1,34 @@
+import logging
+
+import aiohttp
+
+from utils.context import get_context
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DAY = 86400
+# domains of the load generator are this plus their identity id, which makes
+# them 7 letters long: they all have the same price
+DOMAIN_BASE = 38**6
+
+
+async def _post(path, payload=None, context=None):
+    # starknet-devnet specific endpoints, next to its gateways
+    url = (context or get_context()).network["devnet_url"] + path
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, json=payload or {}) as response:
+            if response.status >= 300:
+                raise RuntimeError(
+                    f"{path} failed with {response.status}: {await response.text()}"
+                )
+            return await response.json(content_type=None)
+
+
+async def increase_time(seconds, context=None):
+    # shifts the timestamp of the following blocks, a block is then created so
+    # that calls on "latest" already see the new time
+    await _post("/increase_time", {"time": seconds}, context)
+    await _post("/create_block", context=context)
+    logger.info(f"✅ Devnet time moved forward by {seconds / DAY:.1f} days")
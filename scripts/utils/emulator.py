@@ -0,0 +1,160 @@
+import logging
+
+from utils.renewal import Renewal
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Same rules as AutoRenewal._renew
+RENEWAL_COOLDOWN = 86400 * 364
+EXPIRY_WINDOW = 86400 * 30
+RENEWAL_DAYS = 365
+# allowances are stored on 128 bits, higher ones are capped
+MAX_ALLOWANCE = 2**128 - 1
+
+
+class RevertError(Exception):
+    # raised with the panic message the contract would revert with
+    pass
+
+
+class AutoRenewalEmulator:
+    # In-process model of the AutoRenewal contract storage and of the domain
+    # expiries it reads from naming. It answers eligibility questions without
+    # any call and can be fed with the indexed events (see replay).
+    def __init__(self, admin=0, whitelisted_renewer=0):
+        self.admin = admin
+        self.whitelisted_renewer = whitelisted_renewer
+        self.can_renew = True
+        self.allowances = {}
+        self.meta_hashes = {}
+        self.last_renewals = {}
+        self.expiries = {}
+        self.tax_collected = 0
+
+    def set_expiry(self, domain, expiry):
+        self.expiries[domain] = expiry
+
+    def enable_renewals(self, caller, domain, allowance, meta_hash=0):
+        self.allowances[(caller, domain)] = min(allowance, MAX_ALLOWANCE)
+        self.meta_hashes[(caller, domain)] = meta_hash
+        # we erase the previous renewal date
+        self.last_renewals[(caller, domain)] = 0
+
+    def disable_renewals(self, caller, domain):
+        self.allowances[(caller, domain)] = 0
+
+    def _check_admin(self, caller):
+        if caller != self.admin:
+            raise RevertError("Caller not admin")
+
+    def update_whitelisted_renewer(self, caller, whitelisted_renewer):
+        self._check_admin(caller)
+        self.whitelisted_renewer = whitelisted_renewer
+
+    def toggle_off(self, caller):
+        self._check_admin(caller)
+        self.can_renew = False
+
+    def check(self, domain, renewer, domain_price, tax_price, now):
+        # returns the reason _renew would revert with, None if it goes through
+        if self.allowances.get((renewer, domain), 0) < domain_price + tax_price:
+            return "Renewal allowance insufficient"
+        if now - self.last_renewals.get((renewer, domain), 0) <= RENEWAL_COOLDOWN:
+            return "Domain already renewed"
+        if self.expiries.get(domain, 0) > now + EXPIRY_WINDOW:
+            return "Domain not set to expire"
+        return None
+
+    def _renew(self, domain, renewer, domain_price, tax_price, now, price=None):
+        reason = self.check(domain, renewer, domain_price, tax_price, now)
+        if reason is None and price is not None and domain_price < price:
+            # the contract can't pay naming, the ERC20 transfer underflows
+            reason = "u256_sub Overflow"
+        if reason is not None:
+            raise RevertError(reason)
+        self.last_renewals[(renewer, domain)] = now
+        self.tax_collected += tax_price
+        self.expiries[domain] = (
+            max(self.expiries.get(domain, 0), now) + 86400 * RENEWAL_DAYS
+        )
+
+    def renew(self, caller, renewal, now, price=None):
+        # price is what naming charges for the domain, unchecked when None
+        self.batch_renew(caller, [renewal], now, {renewal.domain: price})
+
+    def batch_renew(self, caller, renewals, now, prices=None):
+        # all or nothing like the transaction, the state is left untouched
+        # when one of the entries reverts
+        if not self.can_renew:
+            raise RevertError("Contract is disabled")
+        if caller != self.whitelisted_renewer:
+            raise RevertError("You are not whitelisted")
+        prices = prices or {}
+        last_renewals, expiries = dict(self.last_renewals), dict(self.expiries)
+        tax_collected = self.tax_collected
+        try:
+            for renewal in renewals:
+                self._renew(
+                    renewal.domain,
+                    renewal.renewer,
+                    renewal.domain_price,
+                    renewal.tax_price,
+                    now,
+                    prices.get(renewal.domain),
+                )
+        except RevertError:
+            self.last_renewals, self.expiries = last_renewals, expiries
+            self.tax_collected = tax_collected
+            raise
+
+    def batch_renew_aggregated(self, caller, renewals, now, prices=None):
+        # only the ERC20 transfers differ from batch_renew, the taxes of the
+        # batch are sent together at the end
+        self.batch_renew(caller, renewals, now, prices)
+
+    def apply_event(self, name, domain, data):
+        # data is the event data as ints, see utils.indexer
+        renewer = data[0]
+        if name == "UpdatedRenewal":
+            self.enable_renewals(renewer, domain, data[1] + (data[2] << 128), data[3])
+        elif name == "DisabledRenewal":
+            self.disable_renewals(renewer, domain)
+        else:
+            timestamp = data[7]
+            self.last_renewals[(renewer, domain)] = timestamp
+            if domain in self.expiries:
+                self.expiries[domain] = (
+                    max(self.expiries[domain], timestamp) + 86400 * data[1]
+                )
+
+    def replay(self, events):
+        # events are (name, domain, data) in chain order
+        for name, domain, data in events:
+            self.apply_event(name, domain, data)
+
+    def renewable(self, now, get_price, tax_bps=0):
+        # every enabled pair _renew would accept at `now`, priced with
+        # get_price(domain) plus tax_bps basis points of tax
+        renewals = []
+        min_expiry = now + EXPIRY_WINDOW
+        for (renewer, domain), allowance in self.allowances.items():
+            if not allowance or self.expiries.get(domain, 0) > min_expiry:
+                continue
+            if now - self.last_renewals.get((renewer, domain), 0) <= RENEWAL_COOLDOWN:
+                continue
+            domain_price = get_price(domain)
+            tax_price = domain_price * tax_bps // 10000
+            if allowance < domain_price + tax_price:
+                continue
+            renewals.append(
+                Renewal(
+                    domain,
+                    renewer,
+                    domain_price,
+                    tax_price,
+                    self.meta_hashes.get((renewer, domain), 0),
+                )
+            )
+        return renewals
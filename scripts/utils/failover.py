@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from utils.metrics import Counter, Gauge
+from utils.rpc import DEFAULT_TIMEOUT, RpcClient, get_rpc_client
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# one client per list of node urls, see get_failover_client
+FAILOVER_CLIENTS = {}
+
+HEDGED_READS = Counter(
+    "starknet_rpc_hedged_reads_total",
+    "Reads also sent to another node after the hedge delay of the first one",
+    ("network", "url"),
+)
+FAILOVERS = Counter(
+    "starknet_rpc_failovers_total",
+    "Reads sent to another node after this one failed",
+    ("network", "url"),
+)
+CIRCUIT_OPEN = Gauge(
+    "starknet_rpc_circuit_open",
+    "1 while the circuit breaker of the node is open",
+    ("network", "url"),
+)
+
+
+def is_node_failure(error):
+    # JSON-RPC errors (eg. a reverted call) are answers of a healthy node, HTTP
+    # errors (see RpcClient._post), timeouts and connection errors are not
+    from starknet_py.net.client_errors import ClientError
+
+    if isinstance(error, ClientError):
+        return isinstance(error.code, str)
+    return True
+
+
+class CircuitBreaker:
+    # Closed, requests go through. After failure_threshold failures in a row it
+    # opens for reset_timeout seconds, then lets a single trial request through:
+    # its success closes the breaker, its failure opens it again.
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self._trial or self.clock() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self):
+        # whether a request can be sent now, which claims the trial when half open
+        state = self.state
+        if state == "half_open":
+            self._trial = True
+        return state != "open"
+
+    def release_trial(self):
+        # the trial request was cancelled before knowing anything of the node
+        self._trial = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+            self._trial = False
+
+
+class Endpoint:
+    # a node with its RpcClient, its breaker and its recent latencies
+    def __init__(self, client, breaker, window=200):
+        self.client = client
+        self.breaker = breaker
+        self.latencies = deque(maxlen=window)
+
+    @property
+    def url(self):
+        return self.client.url
+
+    def percentile(self, percentile):
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[
+            min(len(latencies) - 1, int(len(latencies) * percentile / 100))
+        ]
+
+
+class FailoverClient(RpcClient):
+    # RpcClient over several nodes of the same network. Reads go to the fastest
+    # available node (by median latency) and are also sent to a second node when
+    # the first one takes longer than its hedge_percentile latency, the first
+    # answer wins. A read failing on a node is sent to the next one. Every
+    # request is handled as a read, transactions and their receipts go through
+    # the gateway client of the context instead. Nodes failing repeatedly are
+    # skipped until their circuit breaker lets a trial request through.
+    # Each node keeps its own RpcClient, hence its batching and connections.
+    # Requests timing out after timeout seconds are failures of their node.
+    def __init__(
+        self,
+        urls,
+        network="",
+        hedge_percentile=95,
+        min_hedge_delay=0.02,
+        default_hedge_delay=0.5,
+        min_samples=20,
+        failure_threshold=5,
+        reset_timeout=30,
+        timeout=DEFAULT_TIMEOUT,
+    ):
+        super().__init__(urls[0], network=network, timeout=timeout)
+        self.urls = list(urls)
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay = min_hedge_delay
+        self.default_hedge_delay = default_hedge_delay
+        self.min_samples = min_samples
+        self.endpoints = [
+            Endpoint(
+                get_rpc_client(url, network, timeout),
+                CircuitBreaker(failure_threshold, reset_timeout),
+            )
+            for url in urls
+        ]
+
+    async def close(self):
+        await asyncio.gather(*(endpoint.client.close() for endpoint in self.endpoints))
+
+    def hedge_delay(self, endpoint):
+        if len(endpoint.latencies) < self.min_samples:
+            return self.default_hedge_delay
+        return max(self.min_hedge_delay, endpoint.percentile(self.hedge_percentile))
+
+    def _pick(self, exclude=()):
+        candidates = [e for e in self.endpoints if e not in exclude]
+        # nodes without any latency yet are tried first
+        candidates.sort(key=lambda e: e.percentile(50) or 0)
+        for endpoint in candidates:
+            if endpoint.breaker.allow():
+                return endpoint
+        if exclude:
+            return None
+        # every breaker is open: the node which failed the longest ago gets it
+        return min(candidates, key=lambda e: e.breaker.opened_at)
+
+    async def _request(self, endpoint, method_name, params):
+        start = time.perf_counter()
+        try:
+            result = await endpoint.client.call(method_name, params)
+        except asyncio.CancelledError:
+            # a lost hedge race, it took at least that long
+            endpoint.latencies.append(time.perf_counter() - start)
+            endpoint.breaker.release_trial()
+            raise
+        except Exception as e:
+            if not is_node_failure(e):
+                endpoint.breaker.record_success()
+                raise
+            was_open = endpoint.breaker.state == "open"
+            endpoint.breaker.record_failure()
+            if endpoint.breaker.state == "open" and not was_open:
+                CIRCUIT_OPEN.set(1, network=self.network, url=endpoint.url)
+                logger.warning(
+                    f"⚠️  {endpoint.url} failed {endpoint.breaker.failures} times, "
+                    f"skipping it for {endpoint.breaker.reset_timeout}s: "
+                    f"{str(e) or type(e).__name__}"
+                )
+            raise
+        endpoint.latencies.append(time.perf_counter() - start)
+        if endpoint.breaker.opened_at is not None or endpoint.breaker.failures:
+            CIRCUIT_OPEN.set(0, network=self.network, url=endpoint.url)
+        endpoint.breaker.record_success()
+        return result
+
+    async def call(self, method_name, params):
+        endpoint = self._pick()
+        tried = [endpoint]
+        tasks = {
+            asyncio.ensure_future(
+                self._request(endpoint, method_name, params)
+            ): endpoint
+        }
+        hedged = False
+        error = None
+        try:
+            while tasks:
+                timeout = None if hedged else self.hedge_delay(endpoint)
+                done, _ = await asyncio.wait(
+                    tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # the first node is slow, the first of both answers is kept
+                    hedged = True
+                    hedge = self._pick(exclude=tried)
+                    if hedge is not None:
+                        HEDGED_READS.inc(network=self.network, url=endpoint.url)
+                        tried.append(hedge)
+                        task = self._request(hedge, method_name, params)
+                        tasks[asyncio.ensure_future(task)] = hedge
+                    continue
+                for task in done:
+                    failed = tasks.pop(task)
+                    if task.exception() is None or not is_node_failure(
+                        task.exception()
+                    ):
+                        return task.result()
+                    error = task.exception()
+                if not tasks:
+                    endpoint = self._pick(exclude=tried)
+                    if endpoint is None:
+                        break
+                    FAILOVERS.inc(network=self.network, url=failed.url)
+                    tried.append(endpoint)
+                    task = self._request(endpoint, method_name, params)
+                    tasks[asyncio.ensure_future(task)] = endpoint
+                    hedged = False
+            raise error
+        finally:
+            for task in tasks:
+                if task.done() and not task.cancelled():
+                    # answered along the winner, nothing to wait for
+                    task.exception()
+                task.cancel()
+
+
+def get_failover_client(urls, network="", **kwargs) -> FailoverClient:
+    key = tuple(urls)
+    if key not in FAILOVER_CLIENTS:
+        FAILOVER_CLIENTS[key] = FailoverClient(urls, network, **kwargs)
+    return FAILOVER_CLIENTS[key]
@@ -0,0 +1,122 @@
+import logging
+from collections import deque
+
+from starknet_py.net.client_errors import ClientError
+
+from utils.constants import FEE_MARGIN
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# used when a transaction can't be estimated, eg. its nonce isn't reachable
+# from the pending block yet
+DEFAULT_MAX_FEE = int(1e17)
+
+
+class FeeModel:
+    # Least squares fit of gas_usage = base + per_entry * size over the last
+    # `window` estimates, gas being independent of the gas price
+    def __init__(self, window=50):
+        self.samples = deque(maxlen=window)
+
+    def observe(self, size, gas_usage):
+        self.samples.append((size, gas_usage))
+
+    def fit(self):
+        if not self.samples:
+            return None
+        n = len(self.samples)
+        mean_size = sum(size for size, _ in self.samples) / n
+        mean_gas = sum(gas for _, gas in self.samples) / n
+        variance = sum((size - mean_size) ** 2 for size, _ in self.samples)
+        if not variance:
+            # a single batch size, all of the gas is attributed to the entries
+            return 0, mean_gas / mean_size if mean_size else 0
+        per_entry = (
+            sum((size - mean_size) * (gas - mean_gas) for size, gas in self.samples)
+            / variance
+        )
+        return mean_gas - per_entry * mean_size, per_entry
+
+    def gas(self, size):
+        fit = self.fit()
+        if fit is None:
+            return None
+        base, per_entry = fit
+        return base + per_entry * size
+
+
+class FeeEstimator:
+    # Estimates many transactions in one estimate_fee request and learns the
+    # gas of each kind of batch against its size, so that max fees can be
+    # predicted and batches sized against a fee budget.
+    def __init__(self, account, margin=FEE_MARGIN, default_max_fee=DEFAULT_MAX_FEE):
+        self.account = account
+        self.margin = margin
+        self.default_max_fee = default_max_fee
+        self.gas_price = None
+        self.models = {}
+
+    def with_margin(self, overall_fee):
+        return int(overall_fee * self.margin)
+
+    async def estimate(self, transactions):
+        # transactions are signed with any max_fee, they are estimated in a row
+        # so each one sees the state left by the previous ones
+        transactions = [
+            await self.account.sign_for_fee_estimate(transaction)
+            for transaction in transactions
+        ]
+        estimates = await self.account.client.estimate_fee(
+            transactions, block_number="pending"
+        )
+        if estimates:
+            self.gas_price = estimates[-1].gas_price
+        return estimates
+
+    async def max_fee(self, sign, nonce):
+        # sign builds the transaction for a (nonce, max_fee)
+        try:
+            (estimate,) = await self.estimate([await sign(nonce, 0)])
+        except ClientError as e:
+            logger.warning(
+                f"⚠️  Fee estimation failed, using {self.default_max_fee}: {e.message}"
+            )
+            return self.default_max_fee
+        return self.with_margin(estimate.overall_fee)
+
+    async def max_fees(self, calls_list, nonce, model=None, sizes=None):
+        # max fees of invoking each calls of calls_list from nonce onwards in a
+        # single request, sizes being the number of entries in each for model
+        transactions = [
+            await self.account.sign_invoke_transaction(
+                calls, nonce=nonce + i, max_fee=0
+            )
+            for i, calls in enumerate(calls_list)
+        ]
+        estimates = await self.estimate(transactions)
+        if model is not None:
+            for size, estimate in zip(sizes, estimates):
+                self.observe(model, size, estimate.gas_usage)
+        return [self.with_margin(estimate.overall_fee) for estimate in estimates]
+
+    def observe(self, model, size, gas_usage):
+        self.models.setdefault(model, FeeModel()).observe(size, gas_usage)
+
+    def predict(self, model, size):
+        # max fee of a batch of `size` entries at the last seen gas price
+        gas = self.models[model].gas(size) if model in self.models else None
+        if gas is None or self.gas_price is None:
+            return None
+        return self.with_margin(gas * self.gas_price)
+
+    def size_for_budget(self, model, budget):
+        # largest batch whose predicted max fee fits in budget, None if unknown
+        fit = self.models[model].fit() if model in self.models else None
+        if fit is None or self.gas_price is None:
+            return None
+        base, per_entry = fit
+        if per_entry <= 0:
+            return None
+        return max(1, int((budget / (self.margin * self.gas_price) - base) / per_entry))
@@ -0,0 +1,175 @@
+import json
+import logging
+import sqlite3
+
+from utils.calldata import get_selector
+from utils.context import get_context
+from utils.starknet import get_deployments
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+AUTO_RENEWAL = "auto_renew_contract_AutoRenewal"
+EVENTS = {
+    get_selector(name): name
+    for name in ("UpdatedRenewal", "DisabledRenewal", "DomainRenewed")
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursor (
+    address TEXT PRIMARY KEY,
+    block_number INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    block_number INTEGER NOT NULL,
+    transaction_hash TEXT NOT NULL,
+    name TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS renewals (
+    renewer TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    allowance TEXT NOT NULL,
+    meta_hash TEXT NOT NULL,
+    last_renewal INTEGER NOT NULL,
+    PRIMARY KEY (renewer, domain)
+);
+"""
+
+
+class RenewalStore:
+    # felts and u256 don't fit in sqlite integers, they are stored as hex strings
+    def __init__(self, path=None, context=None):
+        if path is None:
+            path = (context or get_context()).deployments_dir / "indexer.db"
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def get_cursor(self, address):
+        row = self.db.execute(
+            "SELECT block_number FROM cursor WHERE address = ?", (hex(address),)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def apply(self, address, events, to_block):
+        # events and cursor are committed together, a crash in the middle of a
+        # range will simply replay it from the previous cursor
+        with self.db:
+            for event in events:
+                self._apply_event(event)
+            self.db.execute(
+                "INSERT OR REPLACE INTO cursor VALUES (?, ?)", (hex(address), to_block)
+            )
+
+    def _apply_event(self, event):
+        name = EVENTS[int(event["keys"][0], 16)]
+        domain = hex(int(event["keys"][1], 16))
+        data = [int(value, 16) for value in event["data"]]
+        renewer = hex(data[0])
+        self.db.execute(
+            "INSERT INTO events VALUES (?, ?, ?, ?, ?)",
+            (
+                event["block_number"],
+                event["transaction_hash"],
+                name,
+                domain,
+                json.dumps([hex(value) for value in data]),
+            ),
+        )
+        if name == "UpdatedRenewal":
+            # enable_renewals erases the previous renewal date
+            allowance = data[1] + (data[2] << 128)
+            self.db.execute(
+                "INSERT OR REPLACE INTO renewals VALUES (?, ?, ?, ?, 0)",
+                (renewer, domain, hex(allowance), hex(data[3])),
+            )
+        elif name == "DisabledRenewal":
+            self.db.execute(
+                "INSERT INTO renewals VALUES (?, ?, '0x0', '0x0', 0) "
+                "ON CONFLICT (renewer, domain) DO UPDATE SET allowance = '0x0'",
+                (renewer, domain),
+            )
+        else:
+            self.db.execute(
+                "INSERT INTO renewals VALUES (?, ?, '0x0', '0x0', ?) "
+                "ON CONFLICT (renewer, domain) DO UPDATE SET last_renewal = excluded.last_renewal",
+                (renewer, domain, data[7]),
+            )
+
+    def get_events(self, from_block=0):
+        # (name, domain, data) of the indexed events in chain order
+        for name, domain, data in self.db.execute(
+            "SELECT name, domain, data FROM events WHERE block_number >= ? ORDER BY rowid",
+            (from_block,),
+        ):
+            yield name, int(domain, 16), [int(value, 16) for value in json.loads(data)]
+
+    def get_renewals(self, enabled_only=True, since_block=None):
+        # since_block only returns the pairs of domains with events after that
+        # block, disabled ones included whatever enabled_only says
+        query = (
+            "SELECT renewer, domain, allowance, meta_hash, last_renewal FROM renewals"
+        )
+        params = ()
+        if since_block is not None:
+            query += (
+                " WHERE domain IN (SELECT domain FROM events WHERE block_number > ?)"
+            )
+            params = (since_block,)
+        elif enabled_only:
+            query += " WHERE allowance != '0x0'"
+        return [
+            {
+                "renewer": int(renewer, 16),
+                "domain": int(domain, 16),
+                "allowance": int(allowance, 16),
+                "meta_hash": int(meta_hash, 16),
+                "last_renewal": last_renewal,
+            }
+            for renewer, domain, allowance, meta_hash, last_renewal in self.db.execute(
+                query, params
+            )
+        ]
+
+
+async def fetch_events(client, address, from_block, to_block, chunk_size=1000):
+    events = []
+    continuation_token = None
+    while True:
+        params = {
+            "from_block": {"block_number": from_block},
+            "to_block": {"block_number": to_block},
+            "address": hex(address),
+            "keys": [[hex(selector) for selector in EVENTS]],
+            "chunk_size": chunk_size,
+        }
+        if continuation_token is not None:
+            params["continuation_token"] = continuation_token
+        res = await client.call(method_name="getEvents", params={"filter": params})
+        events += res["events"]
+        continuation_token = res.get("continuation_token")
+        if continuation_token is None:
+            return events
+
+
+async def sync(
+    store, client=None, address=None, start_block=0, block_range=1000, context=None
+):
+    context = context or get_context()
+    client = client or context.rpc
+    if address is None:
+        address = int(get_deployments(context)[AUTO_RENEWAL]["address"], 16)
+    cursor = store.get_cursor(address)
+    from_block = start_block if cursor is None else cursor + 1
+    latest = await client.call(method_name="blockNumber", params={})
+    while from_block <= latest:
+        to_block = min(from_block + block_range - 1, latest)
+        events = await fetch_events(client, address, from_block, to_block)
+        store.apply(address, events, to_block)
+        logger.info(
+            f"ℹ️  Indexed {len(events)} {context.name} events from blocks {from_block} to {to_block}"
+        )
+        from_block = to_block + 1
+    return latest
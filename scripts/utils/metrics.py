@@ -0,0 +1,274 @@
+import functools
+import inspect
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from utils.context import get_context
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# latency buckets in seconds, from a cached read to a transaction being accepted
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    # One metric family, with a value per set of label values. Label values
+    # are given as keyword arguments, missing ones being empty strings.
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        (REGISTRY if registry is None else registry).register(self)
+
+    def _key(self, labels):
+        unknown = set(labels) - set(self.labelnames)
+        if unknown:
+            raise ValueError(f"Unknown labels {sorted(unknown)} for {self.name}")
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        # (suffix, label values, extra labels, value) of the exposition
+        for key, value in sorted(self._values.items()):
+            yield "", key, (), value
+
+    def expose(self):
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, key, extra, value in self.samples():
+            labels = _format_labels(self.labelnames, key, extra)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None
+    ):
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        if key not in self._values:
+            self._values[key] = {
+                "buckets": [0] * len(self.buckets),
+                "sum": 0,
+                "count": 0,
+            }
+        data = self._values[key]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                data["buckets"][i] += 1
+        data["sum"] += value
+        data["count"] += 1
+
+    def get(self, **labels):
+        # number of observations, see samples for the buckets and sum
+        data = self._values.get(self._key(labels))
+        return 0 if data is None else data["count"]
+
+    def samples(self):
+        # buckets are cumulative, as the exposition format expects
+        for key, data in sorted(self._values.items()):
+            for bound, count in zip(self.buckets, data["buckets"]):
+                yield "_bucket", key, (("le", _format_value(float(bound))),), count
+            yield "_sum", key, (), data["sum"]
+            yield "_count", key, (), data["count"]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+
+    def expose(self):
+        # Prometheus text format, version 0.0.4
+        return "".join(f"{metric.expose()}\n" for metric in self.metrics.values())
+
+
+REGISTRY = Registry()
+
+# contract is always the hex address of the called contract, empty when the
+# call targets none (eg. a block or a class being declared)
+LABELS = ("method", "contract", "network")
+CALL_SECONDS = Histogram(
+    "starknet_call_duration_seconds",
+    "Duration of the node calls and of the helpers sending transactions",
+    LABELS,
+)
+CALLS_IN_FLIGHT = Gauge(
+    "starknet_calls_in_flight", "Node calls and helpers currently running", LABELS
+)
+CALL_ERRORS = Counter(
+    "starknet_call_errors_total",
+    "Node calls and helpers which raised, by exception type",
+    LABELS + ("error",),
+)
+
+
+@asynccontextmanager
+async def track(method, contract="", network=""):
+    # times the block and counts it as in flight while it runs, exceptions are
+    # counted as errors before being raised again
+    labels = {"method": method, "contract": contract, "network": network}
+    CALLS_IN_FLIGHT.inc(**labels)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        CALL_ERRORS.inc(**labels, error=type(e).__name__)
+        raise
+    finally:
+        CALL_SECONDS.observe(time.perf_counter() - start, **labels)
+        CALLS_IN_FLIGHT.dec(**labels)
+
+
+def contract_label(address):
+    # hex address, as the JSON-RPC requests carry it
+    if address is None or address == "":
+        return ""
+    return hex(int(address, 16) if isinstance(address, str) else address)
+
+
+def _helper_contract(arguments, context):
+    # address of the contract called by a helper: its address argument, or the
+    # deployment of its contract_name on the network
+    if arguments.get("address") is not None:
+        return contract_label(arguments["address"])
+    if not arguments.get("function_name") or not arguments.get("contract_name"):
+        return ""
+    path = context.deployments_dir / "deployments.json"
+    if not path.exists():
+        return ""
+    deployment = json.load(open(path)).get(arguments["contract_name"], {})
+    return contract_label(deployment.get("address"))
+
+
+def instrumented(func):
+    # tracks an async helper of utils.starknet, labelled by its name (and the
+    # called function, eg. "invoke:enable_renewals"), the address of the
+    # called contract if any and the network of its context argument
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        arguments = signature.bind_partial(*args, **kwargs).arguments
+        method = func.__name__
+        if arguments.get("function_name"):
+            method += f":{arguments['function_name']}"
+        context = arguments.get("context") or get_context()
+        async with track(method, _helper_contract(arguments, context), context.name):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+def _gateway_contract(args, kwargs):
+    # address of the call or transaction among the arguments of a client method
+    if kwargs.get("contract_address") is not None:
+        return contract_label(kwargs["contract_address"])
+    for value in (*args, *kwargs.values()):
+        for attribute in ("to_addr", "sender_address", "contract_address"):
+            if isinstance(getattr(value, attribute, None), int):
+                return contract_label(getattr(value, attribute))
+    return ""
+
+
+def instrument_client(client, network=""):
+    # tracks every public coroutine method of a starknet_py client (the
+    # gateway client, also used by the accounts), labelled "gateway_<method>"
+    def wrap(name, method):
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            contract = _gateway_contract(args, kwargs)
+            async with track(f"gateway_{name}", contract, network):
+                return await method(*args, **kwargs)
+
+        return wrapper
+
+    # looked up on the class, some properties of the client warn when read
+    for name, _ in inspect.getmembers(type(client), inspect.iscoroutinefunction):
+        if not name.startswith("_"):
+            setattr(client, name, wrap(name, getattr(client, name)))
+    return client
+
+
+async def start_metrics_server(port, host="127.0.0.1", registry=None):
+    # serves the registry on http://<host>:<port>/metrics until the event loop
+    # stops, returns the aiohttp runner to clean it up earlier. Port 0 picks a
+    # free port, see runner.addresses
+    from aiohttp import web
+
+    registry = REGISTRY if registry is None else registry
+
+    async def metrics(request):
+        return web.Response(
+            body=registry.expose().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    port = runner.addresses[0][1]
+    logger.info(f"ℹ️  Serving metrics on http://{host}:{port}/metrics")
+    return runner
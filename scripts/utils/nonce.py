@@ -0,0 +1,93 @@
+import asyncio
+import logging
+
+from starknet_py.net.client_errors import ClientError
+from starknet_py.net.models.transaction import Declare, DeclareV2
+from starknet_py.transaction_errors import (
+    TransactionNotReceivedError,
+    TransactionRejectedError,
+)
+
+from utils.fees import FeeEstimator
+from utils.receipts import ReceiptTracker
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class NonceManager:
+    # Assigns nonces locally so that up to max_in_flight transactions of the
+    # same account can be pending at once, instead of waiting for each receipt.
+    def __init__(self, account, tracker=None, max_in_flight=16, fees=None):
+        self.account = account
+        self.tracker = tracker or ReceiptTracker(account.client)
+        self.fees = fees or FeeEstimator(account)
+        self.nonce = None
+        self.pending = set()
+        self._lock = asyncio.Lock()
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def resync(self):
+        self.nonce = await self.account.get_nonce(block_number="pending")
+        logger.info(f"ℹ️  Nonce of {hex(self.account.address)} synced to {self.nonce}")
+
+    async def submit(self, sign, max_fee=None):
+        # sign is an async callable building the signed transaction for a given
+        # nonce and max fee, the max fee being estimated when not given.
+        # Returns the transaction hash and a future of its receipt.
+        await self._in_flight.acquire()
+        try:
+            async with self._lock:
+                if self.nonce is None:
+                    await self.resync()
+                if max_fee is None:
+                    max_fee = await self.fees.max_fee(sign, self.nonce)
+                transaction = await sign(self.nonce, max_fee)
+                try:
+                    if isinstance(transaction, (Declare, DeclareV2)):
+                        response = await self.account.client.declare(transaction)
+                    else:
+                        response = await self.account.client.send_transaction(
+                            transaction
+                        )
+                except ClientError:
+                    # the node refused it, our nonce is likely stale
+                    await self.resync()
+                    raise
+                self.nonce += 1
+        except BaseException:
+            self._in_flight.release()
+            raise
+
+        receipt = asyncio.ensure_future(self._track(response.transaction_hash))
+        self.pending.add(receipt)
+        receipt.add_done_callback(self.pending.discard)
+        return response, receipt
+
+    async def invoke(self, calls, max_fee=None):
+        return await self.submit(
+            lambda nonce, max_fee: self.account.sign_invoke_transaction(
+                calls, nonce=nonce, max_fee=max_fee
+            ),
+            max_fee,
+        )
+
+    async def wait_pending(self):
+        return await asyncio.gather(*self.pending)
+
+    async def _track(self, tx_hash):
+        try:
+            return await self.tracker.wait_for_tx(tx_hash)
+        except (
+            TransactionRejectedError,
+            TransactionNotReceivedError,
+            asyncio.TimeoutError,
+        ):
+            # a rejected or dropped transaction doesn't consume its nonce, every
+            # following one waits behind the gap until we resync
+            async with self._lock:
+                await self.resync()
+            raise
+        finally:
+            self._in_flight.release()
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def dump_json_atomic(data, path):
+    # written next to the target then renamed over it, a crash never leaves
+    # a truncated file behind
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class Journal:
+    # Results of the completed steps, saved after each of them
+    def __init__(self, path):
+        self.path = path
+        try:
+            self.results = json.load(open(path))
+        except FileNotFoundError:
+            self.results = {}
+
+    def __contains__(self, name):
+        return name in self.results
+
+    def record(self, name, result):
+        self.results[name] = result
+        dump_json_atomic(self.results, self.path)
+
+    def reset(self):
+        self.results = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Pipeline:
+    # Steps are async callables taking the results of the steps so far, each
+    # one starts as soon as its dependencies are done. Results must be JSON
+    # serializable: they are journaled so that a rerun skips finished steps.
+    def __init__(self, journal, on_step=None):
+        self.journal = journal
+        self.on_step = on_step
+        self.steps = {}
+
+    def add(self, name, run, deps=()):
+        self.steps[name] = (run, tuple(deps))
+
+    def _ordered(self):
+        ordered, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name not in self.steps:
+                raise ValueError(f"Unknown step {name}")
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through {name}")
+            visiting.add(name)
+            for dep in self.steps[name][1]:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            ordered.append(name)
+
+        for name in self.steps:
+            visit(name)
+        return ordered
+
+    async def _run_step(self, name, tasks, results, durations):
+        run, deps = self.steps[name]
+        await asyncio.gather(*(tasks[dep] for dep in deps))
+        if name in self.journal:
+            results[name] = self.journal.results[name]
+            logger.info(f"ℹ️  {name} already done, skipping")
+            return
+        start = time.monotonic()
+        logger.info(f"⏳ {name}...")
+        results[name] = await run(results)
+        durations[name] = time.monotonic() - start
+        self.journal.record(name, results[name])
+        if self.on_step is not None:
+            self.on_step(results)
+        logger.info(f"✅ {name} done in {durations[name]:.1f}s")
+
+    async def run(self):
+        results, durations, tasks = {}, {}, {}
+        start = time.monotonic()
+        for name in self._ordered():
+            tasks[name] = asyncio.ensure_future(
+                self._run_step(name, tasks, results, durations)
+            )
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            # what already completed is journaled, the rest is redone next run
+            for task in tasks.values():
+                task.cancel()
+            raise
+        logger.info(
+            f"✅ {len(durations)} steps done in {time.monotonic() - start:.1f}s "
+            f"({sum(durations.values()):.1f}s if run one after the other)"
+        )
+        return results
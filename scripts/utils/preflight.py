@@ -0,0 +1,170 @@
+import asyncio
+import logging
+
+from starknet_py.net.client_errors import ClientError
+from starknet_py.net.client_models import Call
+
+from utils.cache import get_call_cache
+from utils.calldata import get_selector
+from utils.constants import ETH_TOKEN_ADDRESS
+from utils.context import get_context
+from utils.failover import is_node_failure
+from utils.starknet import get_deployments, get_renewal_states
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+AUTO_RENEWAL = "auto_renew_contract_AutoRenewal"
+# Same rules as AutoRenewal._renew
+RENEWAL_COOLDOWN = 86400 * 364
+EXPIRY_WINDOW = 86400 * 30
+# DomainData is (owner, resolver, address, expiry, key, parent_key)
+EXPIRY_INDEX = 3
+# AutoRenewal deployments found without the get_renewal_states view
+WITHOUT_RENEWAL_STATES = set()
+
+
+async def _read(semaphore, client, to_addr, function_name, calldata, block_number):
+    async with semaphore:
+        return await client.call_contract(
+            Call(
+                to_addr=to_addr,
+                selector=get_selector(function_name),
+                calldata=calldata,
+            ),
+            block_number=block_number,
+        )
+
+
+def _uint256(low, high):
+    return low + (high << 128)
+
+
+async def _get_states(
+    read, renewals, last_renewals, auto_renewal, naming, block_number, client, context
+):
+    # allowance, last_renewal and expiry of each renewal, read by chunks with
+    # get_renewal_states. Deployments older than that view are read pair by pair,
+    # their last renewals then come from the DomainRenewed events.
+    pairs = [(r.renewer, r.domain) for r in renewals]
+    if auto_renewal not in WITHOUT_RENEWAL_STATES:
+        try:
+            return await get_renewal_states(
+                pairs,
+                address=auto_renewal,
+                block_number=block_number,
+                client=client,
+                context=context,
+            )
+        except ClientError as e:
+            if is_node_failure(e):
+                raise
+            logger.warning(
+                f"⚠️  {hex(auto_renewal)} has no get_renewal_states, "
+                f"reading renewals one by one: {e.message}"
+            )
+            WITHOUT_RENEWAL_STATES.add(auto_renewal)
+
+    results = await asyncio.gather(
+        *(
+            read(auto_renewal, "get_renewing_allowance", [r.domain, r.renewer])
+            for r in renewals
+        ),
+        *(read(naming, "domain_to_data", [1, r.domain]) for r in renewals),
+    )
+    return [
+        {
+            "allowance": _uint256(*allowance),
+            "last_renewal": last_renewals.get(pair, 0),
+            "expiry": data[EXPIRY_INDEX],
+        }
+        for pair, allowance, data in zip(
+            pairs, results[: len(renewals)], results[len(renewals) :]
+        )
+    ]
+
+
+async def preflight(
+    renewals,
+    last_renewals=None,
+    concurrency=500,
+    client=None,
+    auto_renewal=None,
+    naming=None,
+    erc20=ETH_TOKEN_ADDRESS,
+    context=None,
+):
+    # Drops every entry which would make batch_renew revert. All reads are done
+    # against the same block, with at most `concurrency` calls in flight, which
+    # the RPC client packs into JSON-RPC batches.
+    # last_renewals maps (renewer, domain) to the last renewal timestamp. It is
+    # only used for deployments without get_renewal_states, which can't read it
+    # (see utils.indexer).
+    context = context or get_context()
+    client = client or get_call_cache(context.rpc)
+    last_renewals = last_renewals or {}
+    deployments = (
+        get_deployments(context) if auto_renewal is None or naming is None else {}
+    )
+    if auto_renewal is None:
+        auto_renewal = int(deployments[AUTO_RENEWAL]["address"], 16)
+    if naming is None:
+        naming = int(deployments["naming"]["address"], 16)
+
+    block = await client.get_block(block_number="latest")
+    now = block.timestamp
+    semaphore = asyncio.Semaphore(concurrency)
+
+    def read(to_addr, function_name, calldata):
+        return _read(
+            semaphore, client, to_addr, function_name, calldata, block.block_number
+        )
+
+    renewers = list({r.renewer for r in renewals})
+    states, results = await asyncio.gather(
+        _get_states(
+            read,
+            renewals,
+            last_renewals,
+            auto_renewal,
+            naming,
+            block.block_number,
+            client,
+            context,
+        ),
+        asyncio.gather(
+            *(
+                read(erc20, "allowance", [renewer, auto_renewal])
+                for renewer in renewers
+            ),
+            *(read(erc20, "balanceOf", [renewer]) for renewer in renewers),
+        ),
+    )
+    m = len(renewers)
+    # transferFrom is done entry by entry, so a renewer can only be charged
+    # until its ERC20 allowance or balance runs out
+    spendable = {
+        renewer: min(_uint256(*erc20_allowance), _uint256(*balance))
+        for renewer, erc20_allowance, balance in zip(renewers, results[:m], results[m:])
+    }
+
+    eligible = []
+    for renewal, state in zip(renewals, states):
+        total_price = renewal.domain_price + renewal.tax_price
+        if state["allowance"] < total_price:
+            reason = "Renewal allowance insufficient"
+        elif now - state["last_renewal"] <= RENEWAL_COOLDOWN:
+            reason = "Domain already renewed"
+        elif state["expiry"] > now + EXPIRY_WINDOW:
+            reason = "Domain not set to expire"
+        elif spendable[renewal.renewer] < total_price:
+            reason = "ERC20 allowance or balance insufficient"
+        else:
+            spendable[renewal.renewer] -= total_price
+            eligible.append(renewal)
+            continue
+        logger.info(f"ℹ️  Skipping {hex(renewal.domain)}: {reason}")
+
+    logger.info(f"✅ {len(eligible)}/{len(renewals)} domains can be renewed")
+    return eligible
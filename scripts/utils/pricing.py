@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+
+from starknet_py.net.client_models import Call
+
+from utils.calldata import get_selector
+from utils.constants import PRICING_ADDRESS, PRICING_ADDRESS_MAINNET
+from utils.context import get_context
+from utils.starknet import get_deployments
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Domains are encoded in base 38, 37 being the escape to the 2 letters big
+# alphabet (see starknet.id naming get_chars_len)
+BASIC_SIZE_PLUS_ONE = 38
+ESCAPE_CODE = 37
+BIG_ALPHABET_SIZE = 2
+
+# Pricing only distinguishes lengths up to 5, longer domains all cost the same
+MAX_PRICED_LENGTH = 5
+
+# one price table per network, see get_price_table
+PRICE_TABLES = {}
+
+
+def domain_length(domain):
+    length = 0
+    while domain:
+        domain, code = divmod(domain, BASIC_SIZE_PLUS_ONE)
+        if code == ESCAPE_CODE:
+            domain //= BIG_ALPHABET_SIZE
+        length += 1
+    return length
+
+
+class PriceTable:
+    # Local copy of the pricing contract table, indexed by (length, days). It
+    # is fetched once and refreshed every `epoch` seconds, so pricing a batch
+    # doesn't need any call.
+    def __init__(self, client, pricing_address, epoch=3600):
+        self.client = client
+        self.pricing_address = pricing_address
+        self.epoch = epoch
+        self.prices = {}
+        self._fetched_at = {}
+
+    async def _fetch(self, length, days):
+        # same arguments as deploy_devnet.py: compute_buy_price(domain_len, days)
+        # returns (erc20, price.low, price.high)
+        _, low, high = await self.client.call_contract(
+            Call(
+                to_addr=self.pricing_address,
+                selector=get_selector("compute_buy_price"),
+                calldata=[length, days],
+            )
+        )
+        self.prices[(length, days)] = low + (high << 128)
+        self._fetched_at[days] = time.monotonic()
+
+    async def refresh(self, days=365, force=False):
+        fetched_at = self._fetched_at.get(days)
+        if not force and fetched_at and time.monotonic() - fetched_at < self.epoch:
+            return
+        await asyncio.gather(
+            *(self._fetch(length, days) for length in range(1, MAX_PRICED_LENGTH + 1))
+        )
+        logger.info(
+            f"ℹ️  Price table refreshed for {days} days: "
+            + ", ".join(
+                f"{length}: {self.prices[(length, days)]}"
+                for length in range(1, MAX_PRICED_LENGTH + 1)
+            )
+        )
+
+    async def get_prices(self, domains, days=365, tax_bps=0):
+        # returns the domain_prices and tax_prices columns of batch_renew,
+        # tax_bps being the tax in basis points, either one value or one per domain
+        await self.refresh(days)
+        domain_prices = [
+            self.prices[(min(domain_length(domain), MAX_PRICED_LENGTH), days)]
+            for domain in domains
+        ]
+        if isinstance(tax_bps, int):
+            tax_bps = [tax_bps] * len(domains)
+        tax_prices = [
+            price * bps // 10000 for price, bps in zip(domain_prices, tax_bps)
+        ]
+        return domain_prices, tax_prices
+
+
+def get_price_table(context=None) -> PriceTable:
+    context = context or get_context()
+    if context.name not in PRICE_TABLES:
+        deployments = get_deployments(context)
+        if "pricing" in deployments:
+            pricing_address = int(deployments["pricing"]["address"], 16)
+        elif context.name == "mainnet":
+            pricing_address = PRICING_ADDRESS_MAINNET
+        else:
+            pricing_address = PRICING_ADDRESS
+        PRICE_TABLES[context.name] = PriceTable(context.rpc, pricing_address)
+    return PRICE_TABLES[context.name]
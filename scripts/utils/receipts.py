@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+
+from starknet_py.net.client_errors import ClientError
+from starknet_py.net.client_models import (
+    TransactionExecutionStatus,
+    TransactionReceipt,
+    TransactionStatus,
+)
+from starknet_py.transaction_errors import (
+    TransactionNotReceivedError,
+    TransactionRejectedError,
+    TransactionRevertedError,
+)
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class ReceiptTracker:
+    # Resolves the receipts of every tracked transaction from a single polling
+    # loop reading each new block once, instead of one wait_for_tx loop per
+    # transaction. RPC load follows the number of blocks, not of transactions.
+    # Transactions not found in the lookback blocks following their submission
+    # have their receipt queried on their own, so that rejections are noticed
+    # within a few blocks instead of at the deadline.
+    def __init__(self, client, interval=2, timeout=300, lookback=5, reorg_depth=10):
+        self.client = client
+        self.interval = interval
+        self.timeout = timeout
+        self.lookback = lookback
+        self.reorg_depth = reorg_depth
+        self.pending = {}
+        self.cursor = None
+        self.block_hashes = {}
+        self._task = None
+        self._restarted = False
+
+    def track(self, tx_hash):
+        future = asyncio.get_running_loop().create_future()
+        # the block after which it is looked up on its own is set by poll
+        self.pending[tx_hash] = (future, time.monotonic() + self.timeout, None)
+        if self._task is None or self._task.done():
+            self._restarted = True
+            self._task = asyncio.ensure_future(self._run())
+        return future
+
+    async def wait_for_tx(self, tx_hash):
+        return await self.track(tx_hash)
+
+    async def _run(self):
+        while self.pending:
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.warning(f"⚠️  Receipt polling failed: {e}")
+            await self._check_missing()
+            if self.pending:
+                await asyncio.sleep(self.interval)
+
+    async def poll(self):
+        latest = await self.client.get_block(block_number="latest")
+        for tx_hash, (future, deadline, check_block) in self.pending.items():
+            if check_block is None:
+                check_block = latest.block_number + self.lookback
+                self.pending[tx_hash] = (future, deadline, check_block)
+        if self._restarted:
+            # after being idle we don't go through old blocks again, only the
+            # last ones where transactions may have landed before polling began
+            self._restarted = False
+            if self.cursor is None or self.cursor < latest.block_number - self.lookback:
+                self.cursor = max(latest.block_number - self.lookback, -1)
+        for block_number in range(self.cursor + 1, latest.block_number):
+            if not self._scan(await self.client.get_block(block_number=block_number)):
+                return
+        if latest.block_number > self.cursor and not self._scan(latest):
+            return
+        self._scan(await self.client.get_block(block_number="pending"))
+
+    def _scan(self, block):
+        # returns False when the block doesn't extend the chain we followed
+        if block.block_number is not None:
+            parent_hash = self.block_hashes.get(block.block_number - 1)
+            if parent_hash is not None and parent_hash != block.parent_block_hash:
+                # the chain we followed was replaced, read the last blocks again
+                logger.warning(f"⚠️  Reorg detected at block {block.block_number}")
+                self.cursor = block.block_number - self.reorg_depth
+                self.block_hashes = {
+                    n: h for n, h in self.block_hashes.items() if n < self.cursor
+                }
+                return False
+            self.block_hashes[block.block_number] = block.block_hash
+            self.block_hashes.pop(block.block_number - self.reorg_depth, None)
+            self.cursor = max(self.cursor, block.block_number)
+
+        for receipt in block.transaction_receipts:
+            if receipt.transaction_hash not in self.pending:
+                continue
+            future, *_ = self.pending.pop(receipt.transaction_hash)
+            if future.done():
+                continue
+            if receipt.execution_status == TransactionExecutionStatus.REVERTED:
+                future.set_exception(
+                    TransactionRevertedError(message=receipt.revert_error)
+                )
+                continue
+            future.set_result(
+                TransactionReceipt(
+                    transaction_hash=receipt.transaction_hash,
+                    events=receipt.events,
+                    l2_to_l1_messages=receipt.l2_to_l1_messages,
+                    execution_status=receipt.execution_status,
+                    finality_status=receipt.finality_status,
+                    block_number=block.block_number,
+                    block_hash=block.block_hash,
+                    actual_fee=receipt.actual_fee,
+                    revert_error=receipt.revert_error,
+                    execution_resources=receipt.execution_resources,
+                    transaction_index=receipt.transaction_index,
+                )
+            )
+        return True
+
+    async def _check_missing(self):
+        # rejected transactions never make it into a block, anything not seen
+        # lookback blocks after its submission is checked on its own, then
+        # again every lookback blocks until its deadline
+        now = time.monotonic()
+        for tx_hash, (future, deadline, check_block) in list(self.pending.items()):
+            expired = deadline <= now
+            if not expired and (check_block is None or check_block > self.cursor):
+                continue
+            try:
+                receipt = await self.client.get_transaction_receipt(tx_hash)
+            except ClientError:
+                receipt = None
+            if receipt is not None and receipt.status == TransactionStatus.REJECTED:
+                error = TransactionRejectedError(message=receipt.rejection_reason)
+            elif (
+                receipt is not None
+                and receipt.execution_status == TransactionExecutionStatus.REVERTED
+            ):
+                error = TransactionRevertedError(message=receipt.revert_error)
+            elif receipt is not None and receipt.block_number is not None:
+                error = None
+            elif expired:
+                error = TransactionNotReceivedError()
+            else:
+                # still waiting in the mempool
+                self.pending[tx_hash] = (future, deadline, self.cursor + self.lookback)
+                continue
+            del self.pending[tx_hash]
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(receipt)
+            else:
+                future.set_exception(error)
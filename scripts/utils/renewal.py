@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import time
+from typing import List, NamedTuple, Tuple
+
+from starknet_py.net.client_errors import ClientError
+from starknet_py.net.client_models import Call
+
+from utils.bisection import SimulationBudget, find_reverts
+from utils.calldata import SELECTORS, encode_batch_renew
+from utils.context import get_context
+from utils.metrics import contract_label, track
+from utils.starknet import get_deployments, get_nonce_manager, get_starknet_account
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+AUTO_RENEWAL = "auto_renew_contract_AutoRenewal"
+
+# Each batch_renew entry adds domain (1) + renewer (1) + domain_price (2)
+# + tax_price (2) + metadata (1) felts of calldata, plus 5 span length prefixes
+# per call and the account __execute__ wrapping.
+CALLDATA_FELTS_PER_RENEWAL = 7
+CALLDATA_FELTS_OVERHEAD = 5 + 8
+MAX_CALLDATA_FELTS = 4000
+
+# Rough step cost of a single _renew (allowance/expiry checks, two ERC20 calls
+# and the naming renew through its proxy) against the invoke step limit.
+STEPS_PER_RENEWAL = 15000
+STEPS_OVERHEAD = 20000
+MAX_STEPS = 1000000
+
+# Same cooldown as the contract: a renewed domain can't be renewed again within it
+RENEWAL_COOLDOWN = 86400 * 364
+# simulations of a renewal cycle, entries still undecided are left for the next one
+MAX_SIMULATIONS = 200
+
+
+class Renewal(NamedTuple):
+    domain: int
+    renewer: int
+    domain_price: int
+    tax_price: int
+    metadata: int
+
+
+class BatchRenewResult(NamedTuple):
+    tx_hashes: List[int]
+    # entries of the transactions sent
+    sent: List[Renewal]
+    # (renewal, reason) pairs dropped by the simulation, they were not sent
+    excluded: List[Tuple[Renewal, str]]
+
+
+def max_batch_size(
+    max_calldata_felts=MAX_CALLDATA_FELTS,
+    max_steps=MAX_STEPS,
+    steps_per_renewal=STEPS_PER_RENEWAL,
+):
+    by_calldata = (
+        max_calldata_felts - CALLDATA_FELTS_OVERHEAD
+    ) // CALLDATA_FELTS_PER_RENEWAL
+    by_steps = (max_steps - STEPS_OVERHEAD) // steps_per_renewal
+    return max(1, min(by_calldata, by_steps))
+
+
+def chunk_renewals(renewals: List[Renewal], batch_size=None) -> List[List[Renewal]]:
+    batch_size = batch_size or max_batch_size()
+    return [renewals[i : i + batch_size] for i in range(0, len(renewals), batch_size)]
+
+
+def batch_renew_calldata(renewals: List[Renewal]) -> List[int]:
+    columns = list(zip(*renewals)) or [()] * len(Renewal._fields)
+    return encode_batch_renew(*columns)
+
+
+def batch_renew_call(
+    renewals: List[Renewal], address=None, context=None, entrypoint="batch_renew"
+) -> Call:
+    # entrypoint can also be batch_renew_aggregated, which takes the same
+    # calldata but sends the taxes of the whole batch in a single transfer
+    if address is None:
+        address = int(get_deployments(context)[AUTO_RENEWAL]["address"], 16)
+    return Call(
+        to_addr=address,
+        selector=SELECTORS[entrypoint],
+        calldata=batch_renew_calldata(renewals),
+    )
+
+
+async def estimate_max_fees(fees, batches, address, nonce):
+    # a single estimate_fee request for every batch, which also feeds the gas
+    # model of batch_renew. Batches left without an estimate are estimated on
+    # their own when sent.
+    try:
+        return await fees.max_fees(
+            [batch_renew_call(batch, address) for batch in batches],
+            nonce,
+            model="batch_renew",
+            sizes=[len(batch) for batch in batches],
+        )
+    except ClientError as e:
+        logger.warning(f"⚠️  Batch fee estimation failed: {e.message}")
+        return [None] * len(batches)
+
+
+async def batch_renew(
+    renewals: List[Renewal],
+    batch_size=None,
+    address=None,
+    simulate=True,
+    fee_budget=None,
+    context=None,
+    max_simulations=MAX_SIMULATIONS,
+) -> BatchRenewResult:
+    # All batches go through the account nonce manager and are sent back to
+    # back, we only wait for their receipts once everything is in the mempool.
+    # With simulate, every batch is dry-run first and the entries which would
+    # revert it are excluded before sending, with at most max_simulations
+    # simulations. With fee_budget, batches are sized so that their max fee
+    # stays under it.
+    context = context or get_context()
+    account = await get_starknet_account(context=context)
+    if address is None:
+        address = int(get_deployments(context)[AUTO_RENEWAL]["address"], 16)
+    nonce_manager = await get_nonce_manager(account, context)
+    fees = nonce_manager.fees
+    if fee_budget is not None:
+        budget_size = fees.size_for_budget("batch_renew", fee_budget)
+        if budget_size is not None:
+            batch_size = min(batch_size or max_batch_size(), budget_size)
+    batches = chunk_renewals(renewals, batch_size)
+    excluded = []
+    if simulate:
+        async with track("simulate", contract_label(address), context.name):
+            nonce = await account.get_nonce()
+            budget = SimulationBudget(max_simulations)
+            results = await asyncio.gather(
+                *(
+                    find_reverts(account, batch, address, nonce, budget)
+                    for batch in batches
+                )
+            )
+        batches = [clean for clean, _ in results if clean]
+        excluded = [entry for _, batch_excluded in results for entry in batch_excluded]
+    if not batches:
+        return BatchRenewResult([], [], excluded)
+
+    if nonce_manager.nonce is None:
+        await nonce_manager.resync()
+    max_fees = await estimate_max_fees(fees, batches, address, nonce_manager.nonce)
+    if fee_budget is not None and max(fee or 0 for fee in max_fees) > fee_budget:
+        # the first estimates taught the model how much a batch costs
+        budget_size = fees.size_for_budget("batch_renew", fee_budget)
+        if budget_size is not None and budget_size < max(map(len, batches)):
+            batches = chunk_renewals(sum(batches, []), budget_size)
+            max_fees = await estimate_max_fees(
+                fees, batches, address, nonce_manager.nonce
+            )
+
+    tx_hashes, receipts = [], []
+    for batch, max_fee in zip(batches, max_fees):
+        response, receipt = await nonce_manager.invoke(
+            batch_renew_call(batch, address), max_fee=max_fee
+        )
+        logger.info(
+            f"ℹ️  Sent batch_renew of {len(batch)} domains at tx: {hex(response.transaction_hash)}"
+        )
+        tx_hashes.append(response.transaction_hash)
+        receipts.append(receipt)
+
+    async with track("wait_receipts", contract_label(address), context.name):
+        await asyncio.gather(*receipts)
+    logger.info(
+        f"✅ Renewed {sum(len(batch) for batch in batches)} domains in {len(tx_hashes)} transactions"
+    )
+    return BatchRenewResult(tx_hashes, sum(batches, []), excluded)
+
+
+async def run_keeper(
+    get_candidates,
+    interval=60,
+    batch_size=None,
+    address=None,
+    simulate=True,
+    fee_budget=None,
+    context=None,
+    max_simulations=MAX_SIMULATIONS,
+):
+    # get_candidates is an async callable returning the Renewal entries which
+    # are eligible right now, the keeper only takes care of packing and sending.
+    # Entries sent by this process are skipped until their cooldown is over,
+    # excluded ones are candidates again in the next cycle.
+    # Keepers of different network contexts can run in the same event loop.
+    context = context or get_context()
+    renewed = {}
+    while True:
+        now = time.time()
+        async with track("get_candidates", network=context.name):
+            candidates = await get_candidates()
+        renewals = [
+            r
+            for r in candidates
+            if now - renewed.get((r.renewer, r.domain), 0) > RENEWAL_COOLDOWN
+        ]
+        if renewals:
+            logger.info(f"⏳ Renewing {len(renewals)} domains on {context.name}...")
+            try:
+                if address is None:
+                    address = int(get_deployments(context)[AUTO_RENEWAL]["address"], 16)
+                async with track("batch_renew", contract_label(address), context.name):
+                    result = await batch_renew(
+                        renewals,
+                        batch_size,
+                        address,
+                        simulate,
+                        fee_budget,
+                        context,
+                        max_simulations,
+                    )
+                renewed.update({(r.renewer, r.domain): now for r in result.sent})
+            except Exception as e:
+                logger.error(f"❌ Renewal cycle failed on {context.name}: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+
+import aiohttp
+
+from utils.context import get_context
+from utils.metrics import contract_label, track
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# one client, hence one connection pool, per node url
+RPC_CLIENTS = {}
+# seconds before a request to a stalled node fails, aiohttp waits 300 by default
+DEFAULT_TIMEOUT = 30
+
+
+def _block_id(block_number):
+    if block_number is None or block_number in ("latest", "pending"):
+        return block_number or "latest"
+    return {"block_number": block_number}
+
+
+def _contract(params):
+    # address of a call, an events filter or an invoke, the metrics contract label
+    request = (
+        params.get("request")
+        or params.get("filter")
+        or params.get("invoke_transaction")
+        or {}
+    )
+    return contract_label(
+        request.get("contract_address")
+        or request.get("address")
+        or request.get("sender_address")
+    )
+
+
+class RpcClient:
+    # JSON-RPC client keeping its connections alive between requests. Calls
+    # made concurrently (eg. from asyncio.gather) are coalesced into JSON-RPC
+    # batch arrays of at most batch_size requests, so thousands of reads only
+    # take a few round-trips. Every call is timed by utils.metrics, labelled
+    # with network, the name of the first context using the node. Requests
+    # taking more than timeout seconds fail with asyncio.TimeoutError.
+    def __init__(
+        self,
+        url,
+        batch_size=100,
+        max_connections=10,
+        network="",
+        timeout=DEFAULT_TIMEOUT,
+    ):
+        self.url = url
+        self.network = network
+        self.batch_size = batch_size
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._session = None
+        self._queue = []
+        self._flush_handle = None
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections, keepalive_timeout=60
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def _post(self, payload):
+        async with self._get_session().post(self.url, json=payload) as response:
+            if response.status >= 300:
+                # starknet_py errors are only imported on failure, they pull in
+                # its transaction and hashing modules
+                from starknet_py.net.client_errors import ClientError
+
+                raise ClientError(
+                    code=str(response.status), message=await response.text()
+                )
+            return await response.json(content_type=None)
+
+    async def call(self, method_name, params):
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((f"starknet_{method_name}", params, future))
+        if len(self._queue) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            # wait for the current loop iteration so concurrent calls can join
+            self._flush_handle = asyncio.get_running_loop().call_soon(self._flush)
+        async with track(f"starknet_{method_name}", _contract(params), self.network):
+            return await future
+
+    async def batch(self, requests):
+        # requests is a list of (method_name, params), results keep its order
+        return await asyncio.gather(
+            *(self.call(method_name, params) for method_name, params in requests)
+        )
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        queue, self._queue = self._queue, []
+        if queue:
+            asyncio.ensure_future(self._send(queue))
+
+    async def _send(self, queue):
+        payload = [
+            {"jsonrpc": "2.0", "method": method, "params": params, "id": i}
+            for i, (method, params, _) in enumerate(queue)
+        ]
+        try:
+            # single requests are sent as is, not every node accepts batches
+            responses = await self._post(payload if len(payload) > 1 else payload[0])
+        except Exception as e:
+            for _, _, future in queue:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        if isinstance(responses, dict):
+            responses = [responses]
+        responses = {response.get("id"): response for response in responses}
+        for i, (_, _, future) in enumerate(queue):
+            if future.done():
+                continue
+            response = responses.get(i, {})
+            if "result" in response:
+                future.set_result(response["result"])
+            elif "error" in response:
+                from starknet_py.net.client_errors import ClientError
+
+                future.set_exception(
+                    ClientError(
+                        code=response["error"]["code"],
+                        message=response["error"]["message"],
+                    )
+                )
+            else:
+                from starknet_py.net.http_client import ServerError
+
+                future.set_exception(ServerError(body=response))
+
+    async def call_contract(self, call, block_number=None):
+        res = await self.call(
+            "call",
+            {
+                "request": {
+                    "contract_address": hex(call.to_addr),
+                    "entry_point_selector": hex(call.selector),
+                    "calldata": [hex(value) for value in call.calldata],
+                },
+                "block_id": _block_id(block_number),
+            },
+        )
+        return [int(value, 16) for value in res]
+
+    async def get_block_number(self):
+        return await self.call("blockNumber", {})
+
+    async def get_block(self, block_number=None):
+        from starknet_py.net.schemas.rpc import StarknetBlockWithTxHashesSchema
+
+        res = await self.call(
+            "getBlockWithTxHashes", {"block_id": _block_id(block_number)}
+        )
+        return StarknetBlockWithTxHashesSchema().load(res, unknown="exclude")
+
+
+def get_rpc_client(url=None, network=None, timeout=DEFAULT_TIMEOUT) -> RpcClient:
+    if url is None:
+        context = get_context()
+        url, network = context.network["rpc_url"], context.name
+    if url not in RPC_CLIENTS:
+        RPC_CLIENTS[url] = RpcClient(url, network=network or "", timeout=timeout)
+    return RPC_CLIENTS[url]
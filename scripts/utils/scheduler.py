@@ -0,0 +1,101 @@
+import asyncio
+import heapq
+import logging
+
+from starknet_py.net.client_models import Call
+
+from utils.calldata import get_selector
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Same rules as AutoRenewal._renew: the domain must expire within 30 days and
+# its last renewal must be strictly more than 364 days old
+RENEWAL_COOLDOWN = 86400 * 364
+EXPIRY_WINDOW = 86400 * 30
+# DomainData is (owner, resolver, address, expiry, key, parent_key)
+EXPIRY_INDEX = 3
+
+
+def eligible_at(expiry, last_renewal):
+    return max(expiry - EXPIRY_WINDOW, last_renewal + RENEWAL_COOLDOWN + 1)
+
+
+async def read_expiries(client, naming, domains):
+    results = await asyncio.gather(
+        *(
+            client.call_contract(
+                Call(
+                    to_addr=naming,
+                    selector=get_selector("domain_to_data"),
+                    calldata=[1, domain],
+                )
+            )
+            for domain in domains
+        )
+    )
+    return {domain: data[EXPIRY_INDEX] for domain, data in zip(domains, results)}
+
+
+class RenewalScheduler:
+    # Keeps every enabled (renewer, domain) pair in a heap ordered by the first
+    # timestamp at which it can be renewed, so a tick only touches due pairs.
+    # Rescheduled or removed pairs are left in the heap and skipped when popped.
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def schedule(self, renewer, domain, due, metadata=0):
+        key = (renewer, domain)
+        self._entries[key] = (due, metadata)
+        heapq.heappush(self._heap, (due, renewer, domain))
+
+    def unschedule(self, renewer, domain):
+        self._entries.pop((renewer, domain), None)
+
+    def next_due(self):
+        while self._heap:
+            due, renewer, domain = self._heap[0]
+            if self._entries.get((renewer, domain), (None,))[0] == due:
+                return due
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now):
+        # returns the (renewer, domain, metadata) of every pair due at `now`
+        due_pairs = []
+        while self._heap and self._heap[0][0] <= now:
+            due, renewer, domain = heapq.heappop(self._heap)
+            entry = self._entries.get((renewer, domain))
+            if entry is None or entry[0] != due:
+                continue
+            del self._entries[(renewer, domain)]
+            due_pairs.append((renewer, domain, entry[1]))
+        return due_pairs
+
+    async def update(self, rows, client, naming):
+        # rows are RenewalStore.get_renewals entries, disabled pairs are dropped
+        # and enabled ones scheduled from the expiry of their domain
+        enabled = []
+        for row in rows:
+            if row["allowance"]:
+                enabled.append(row)
+            else:
+                self.unschedule(row["renewer"], row["domain"])
+        expiries = await read_expiries(
+            client, naming, list({row["domain"] for row in enabled})
+        )
+        for row in enabled:
+            self.schedule(
+                row["renewer"],
+                row["domain"],
+                eligible_at(expiries[row["domain"]], row["last_renewal"]),
+                row["meta_hash"],
+            )
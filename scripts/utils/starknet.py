@@ -1,43 +1,43 @@
 # source : https://github.com/kkrt-labs/kakarot/blob/main/scripts/utils/starknet.py
 # adapted to work with cairo1 contracts
 
+import asyncio
 import json
 import logging
 from pathlib import Path
-from copy import deepcopy
+from typing import TYPE_CHECKING
 
-import requests
 from caseconverter import snakecase
-from starknet_py.contract import Contract
-from starknet_py.net.account.account import Account
-from starknet_py.net.client_models import Call
-from starknet_py.net.signer.stark_curve_signer import KeyPair
-from starkware.starknet.public.abi import get_selector_from_name
-
-from starknet_py.common import create_casm_class, create_sierra_compiled_contract
-from starknet_py.hash.casm_class_hash import compute_casm_class_hash
-from starknet_py.hash.sierra_class_hash import compute_sierra_class_hash
-from starknet_py.contract import Contract
-from starknet_py.common import create_compiled_contract
-from starknet_py.hash.class_hash import compute_class_hash
-from starknet_py.net.client_models import Call
-from starknet_py.net.account.account import Account
-from starknet_py.net.udc_deployer.deployer import Deployer
-
 
 from utils.constants import (
     BUILD_DIR,
     BUILD_DIR_V0,
-    DEPLOYMENTS_DIR,
     ETH_TOKEN_ADDRESS,
-    NETWORK,
-    GATEWAY_CLIENT,
 )
+from utils.cache import get_call_cache
+from utils.calldata import get_selector
+from utils.class_cache import get_cairo0_class, get_casm_class_hash, get_sierra_class
+from utils.context import get_context
+from utils.metrics import instrumented
+from utils.pipeline import dump_json_atomic
+
+# starknet_py contracts, accounts and transactions are imported by the helpers
+# using them, reading deployments or calling a view doesn't need them
+if TYPE_CHECKING:
+    from starknet_py.contract import Contract
+    from starknet_py.net.account.account import Account
+
+    from utils.nonce import NonceManager
 
 logging.basicConfig()
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Every helper below takes the network context to use, defaulting to the
+# STARKNET_NETWORK one. Nonce managers and the receipt tracker are kept by the
+# context, RPC clients and call caches are shared between contexts by url.
+# Helpers talking to the network are timed by utils.metrics.
+
 def int_to_uint256(value):
     value = int(value)
     low = value & ((1 << 128) - 1)
@@ -48,14 +48,19 @@ def int_to_uint256(value):
 async def get_starknet_account(
     address=None,
     private_key=None,
-) -> Account:
-    address = address or NETWORK["account_address"]
+    context=None,
+) -> "Account":
+    from starknet_py.net.account.account import Account
+    from starknet_py.net.signer.stark_curve_signer import KeyPair
+
+    context = context or get_context()
+    address = address or context.network["account_address"]
     if address is None:
         raise ValueError(
             "address was not given in arg nor in env variable, see README.md#Deploy"
         )
     address = int(address, 16)
-    private_key = private_key or NETWORK["private_key"]
+    private_key = private_key or context.network["private_key"]
     if private_key is None:
         raise ValueError(
             "private_key was not given in arg nor in env variable, see README.md#Deploy"
@@ -64,46 +69,75 @@ async def get_starknet_account(
 
     return Account(
         address=address,
-        client=GATEWAY_CLIENT,
-        chain=NETWORK["chain_id"],
+        client=context.client,
+        chain=context.chain_id,
         key_pair=key_pair,
     )
 
 
-async def get_eth_contract() -> Contract:
+async def get_nonce_manager(account=None, context=None) -> "NonceManager":
+    # one nonce manager per account address of the network
+    from utils.nonce import NonceManager
+
+    context = context or get_context()
+    account = account or await get_starknet_account(context=context)
+    if account.address not in context.nonce_managers:
+        context.nonce_managers[account.address] = NonceManager(
+            account, context.receipt_tracker
+        )
+    return context.nonce_managers[account.address]
+
+
+@instrumented
+async def wait_for_tx(tx_hash, context=None):
+    return await (context or get_context()).receipt_tracker.wait_for_tx(tx_hash)
+
+
+async def wait_pending(context=None):
+    # waits for every transaction sent with wait=False
+    context = context or get_context()
+    return await asyncio.gather(
+        *(manager.wait_pending() for manager in context.nonce_managers.values())
+    )
+
+
+async def get_eth_contract(context=None) -> "Contract":
+    from starknet_py.contract import Contract
+
     return Contract(
         ETH_TOKEN_ADDRESS,
         json.loads((Path("scripts") / "utils" / "erc20.json").read_text())["abi"],
-        await get_starknet_account(),
+        await get_starknet_account(context=context),
     )
 
 
-async def get_contract(contract_name) -> Contract:
+async def get_contract(contract_name, context=None) -> "Contract":
+    from starknet_py.contract import Contract
+
     return Contract(
-        get_deployments()[contract_name]["address"],
+        get_deployments(context)[contract_name]["address"],
         json.loads(get_artifact(contract_name).read_text())["abi"],
-        await get_starknet_account(),
+        await get_starknet_account(context=context),
     )
 
-def dump_declarations(declarations):
-    json.dump(
+def dump_declarations(declarations, context=None):
+    dump_json_atomic(
         {name: hex(class_hash) for name, class_hash in declarations.items()},
-        open(DEPLOYMENTS_DIR / "declarations.json", "w"),
-        indent=2,
+        (context or get_context()).deployments_dir / "declarations.json",
     )
 
 
-def get_declarations():
+def get_declarations(context=None):
     return {
         name: int(class_hash, 16)
         for name, class_hash in json.load(
-            open(DEPLOYMENTS_DIR / "declarations.json")
+            open((context or get_context()).deployments_dir / "declarations.json")
         ).items()
     }
 
 
-def dump_deployments(deployments):
-    json.dump(
+def dump_deployments(deployments, context=None):
+    dump_json_atomic(
         {
             name: {
                 **deployment,
@@ -112,13 +146,36 @@ def dump_deployments(deployments):
             }
             for name, deployment in deployments.items()
         },
-        open(DEPLOYMENTS_DIR / "deployments.json", "w"),
-        indent=2,
+        (context or get_context()).deployments_dir / "deployments.json",
+    )
+
+
+def get_deployments(context=None):
+    return json.load(
+        open((context or get_context()).deployments_dir / "deployments.json", "r")
     )
 
 
-def get_deployments():
-    return json.load(open(DEPLOYMENTS_DIR / "deployments.json", "r"))
+def get_previous_deployments(contract_name, storage, context=None):
+    # Deployments to dump back along a new deployment of contract_name. Its
+    # contracts are not upgradeable and their storage is not migrated: when the
+    # recorded deployment has another storage layout, it is kept as
+    # <contract_name>_legacy, its flows staying there until re-enabled.
+    path = (context or get_context()).deployments_dir / "deployments.json"
+    if not path.exists():
+        return {}
+    deployments = {
+        name: {
+            **deployment,
+            "address": int(deployment["address"], 16),
+            "tx": int(deployment["tx"], 16),
+        }
+        for name, deployment in json.load(open(path)).items()
+    }
+    previous = deployments.pop(contract_name, None)
+    if previous is not None and previous.get("storage") != storage:
+        deployments[f"{contract_name}_legacy"] = previous
+    return deployments
 
 
 def get_artifact(contract_name):
@@ -130,56 +187,63 @@ def get_v0_artifact(contract_name):
 def get_alias(contract_name):
     return snakecase(contract_name)
 
-async def declare(contract_name):
+@instrumented
+async def declare(contract_name, wait=True, context=None):
     logger.info(f"ℹ️  Declaring {contract_name}")
+    context = context or get_context()
     artifact = get_v0_artifact(contract_name)
-    compiled_contract = Path(artifact).read_text()
-    contract_class = create_compiled_contract(compiled_contract=compiled_contract)
-    class_hash = compute_class_hash(contract_class=deepcopy(contract_class))
+    class_hash = get_cairo0_class(artifact)["class_hash"]
     try:
-        await GATEWAY_CLIENT.get_class_by_hash(class_hash)
+        await context.client.get_class_by_hash(class_hash)
         logger.info(f"✅ Class already declared, skipping")
         return class_hash
     except Exception:
         pass
-    account = await get_starknet_account()
+    compiled_contract = Path(artifact).read_text()
+    account = await get_starknet_account(context=context)
+    nonce_manager = await get_nonce_manager(account, context)
 
-    declare_transaction = await account.sign_declare_transaction(
-        compiled_contract=compiled_contract, max_fee=int(1e16)
+    resp, receipt = await nonce_manager.submit(
+        lambda nonce, max_fee: account.sign_declare_transaction(
+            compiled_contract=compiled_contract, nonce=nonce, max_fee=max_fee
+        )
     )
-
-    resp = await account.client.declare(transaction=declare_transaction)
-    await account.client.wait_for_tx(resp.transaction_hash)
+    if wait:
+        await receipt
 
     logger.info(f"✅ {contract_name} class hash: {hex(resp.class_hash)}")
     return resp.class_hash
 
-async def deploy(contract_name, *args):
+@instrumented
+async def deploy(contract_name, *args, wait=True, context=None):
+    from starknet_py.net.udc_deployer.deployer import Deployer
+
     logger.info(f"ℹ️  Deploying {contract_name}")
-    artifact = get_v0_artifact(contract_name)
-    compiled_contract = Path(artifact).read_text()
-    abi = json.loads(compiled_contract)["abi"]
-    contract_class = create_compiled_contract(compiled_contract=compiled_contract)
-    class_hash = compute_class_hash(contract_class=deepcopy(contract_class))
-    account = await get_starknet_account()
-    deploy_result = await Contract.deploy_contract(
-        account=account,
+    contract_class = get_cairo0_class(get_v0_artifact(contract_name))
+    class_hash, abi = contract_class["class_hash"], contract_class["abi"]
+    account = await get_starknet_account(context=context)
+    deploy_call, address = Deployer(
+        account_address=account.address
+    ).create_contract_deployment(
         class_hash=class_hash,
         abi=abi,
-        constructor_args=list(args),
-        max_fee=int(1e17),
+        calldata=list(args),
     )
-    await deploy_result.wait_for_acceptance()
+    nonce_manager = await get_nonce_manager(account, context)
+    resp, receipt = await nonce_manager.invoke(deploy_call)
+    if wait:
+        await receipt
     logger.info(
-        f"{contract_name} deployed at: {hex(deploy_result.deployed_contract.address)}"
+        f"{contract_name} deployed at: {hex(address)}"
     )
     return {
-        "address": deploy_result.deployed_contract.address,
-        "tx": deploy_result.hash,
+        "address": address,
+        "tx": resp.transaction_hash,
     }
 
-def get_tx_url(tx_hash: int) -> str:
-    return f"{NETWORK['explorer_url']}/tx/0x{tx_hash:064x}"
+def get_tx_url(tx_hash: int, context=None) -> str:
+    explorer_url = (context or get_context()).network["explorer_url"]
+    return f"{explorer_url}/tx/0x{tx_hash:064x}"
 
 def get_sierra_artifact(contract_name):
     return BUILD_DIR / f"{contract_name}.sierra.json"
@@ -188,124 +252,142 @@ def get_casm_artifact(contract_name):
     return BUILD_DIR / f"{contract_name}.casm.json"
 
 def get_abi(contract_name):
-    sierra_artifact = get_sierra_artifact(contract_name)
-    contract_compiled_sierra = Path(sierra_artifact).read_text()
-    return create_sierra_compiled_contract(compiled_contract = contract_compiled_sierra).abi
+    return get_sierra_class(get_sierra_artifact(contract_name))["abi"]
 
-async def declare_v2(contract_name):
+@instrumented
+async def declare_v2(contract_name, wait=True, context=None):
     logger.info(f"ℹ️  Declaring {contract_name}")
+    context = context or get_context()
 
      # contract_compiled_casm is a string containing the content of the starknet-sierra-compile (.casm file)
-    casm_artifact = get_casm_artifact(contract_name)
-    contract_compiled_casm = Path(casm_artifact).read_text()
-    casm_class = create_casm_class(contract_compiled_casm)
-    casm_class_hash = compute_casm_class_hash(casm_class)
+    casm_class_hash = get_casm_class_hash(get_casm_artifact(contract_name))
 
     # get sierra artifact
     sierra_artifact = get_sierra_artifact(contract_name)
-    contract_compiled_sierra = Path(sierra_artifact).read_text()
-    sierra_class = create_sierra_compiled_contract(contract_compiled_sierra)
-    sierra_class_hash= compute_sierra_class_hash(sierra_class)
+    sierra_class_hash = get_sierra_class(sierra_artifact)["class_hash"]
     # Check has not been declared before
     try:
-        await GATEWAY_CLIENT.get_class_by_hash(class_hash=sierra_class_hash)
+        await context.client.get_class_by_hash(class_hash=sierra_class_hash)
         logger.info(f"✅ Class already declared, skipping")
         return sierra_class_hash
     except Exception:
         pass
 
     # Create Declare v2 transaction
-    account = await get_starknet_account()
-    declare_v2_transaction = await account.sign_declare_v2_transaction(
-        compiled_contract=contract_compiled_sierra,
-        compiled_class_hash=casm_class_hash,
-        max_fee=int(1e17),
-    )
+    contract_compiled_sierra = Path(sierra_artifact).read_text()
+    account = await get_starknet_account(context=context)
+    nonce_manager = await get_nonce_manager(account, context)
 
     # Send Declare v2 transaction
-    resp = await account.client.declare(transaction=declare_v2_transaction)
-    await account.client.wait_for_tx(resp.transaction_hash)
+    resp, receipt = await nonce_manager.submit(
+        lambda nonce, max_fee: account.sign_declare_v2_transaction(
+            compiled_contract=contract_compiled_sierra,
+            compiled_class_hash=casm_class_hash,
+            nonce=nonce,
+            max_fee=max_fee,
+        )
+    )
+    if wait:
+        await receipt
 
     logger.info(f"✅ {contract_name} class hash: {hex(resp.class_hash)}")
     return resp.class_hash
 
-async def deploy_v2(contract_name, *args):
+@instrumented
+async def deploy_v2(contract_name, *args, wait=True, context=None):
+    from starknet_py.net.udc_deployer.deployer import Deployer
+
     logger.info(f"ℹ️  Deploying {contract_name}")
 
-    account = await get_starknet_account()
+    account = await get_starknet_account(context=context)
 
-    sierra_class_hash = get_declarations()[contract_name]
+    sierra_class_hash = get_declarations(context)[contract_name]
     abi = get_abi(contract_name)
     
-    deploy_result = await Contract.deploy_contract(
-        account=account,
+    deploy_call, address = Deployer(
+        account_address=account.address
+    ).create_contract_deployment(
         class_hash=sierra_class_hash,
         abi=json.loads(abi),
-        constructor_args=list(args),
+        calldata=list(args),
         cairo_version=1,
-        max_fee=int(1e17),
     )
-
-    await deploy_result.wait_for_acceptance()
-    print("deploy_result", deploy_result)
+    nonce_manager = await get_nonce_manager(account, context)
+    resp, receipt = await nonce_manager.invoke(deploy_call)
+    if wait:
+        await receipt
 
     logger.info(
-        f"✅ {contract_name} deployed at: {hex(deploy_result.deployed_contract.address)}"
+        f"✅ {contract_name} deployed at: {hex(address)}"
     )
 
     return {
-        "address": deploy_result.deployed_contract.address,
-        "tx": deploy_result.hash,
+        "address": address,
+        "tx": resp.transaction_hash,
     }
 
 
-async def invoke(contract_name, function_name, inputs, address=None):
-    account = await get_starknet_account()
-    deployments = get_deployments()
+@instrumented
+async def invoke(
+    contract_name, function_name, inputs, address=None, wait=True, context=None
+):
+    from starknet_py.net.client_models import Call
+
+    account = await get_starknet_account(context=context)
     call = Call(
-        to_addr=int(deployments[contract_name]["address"], 16) if address is None else address, 
-        selector=get_selector_from_name(function_name), 
+        to_addr=int(get_deployments(context)[contract_name]["address"], 16) if address is None else address, 
+        selector=get_selector(function_name), 
         calldata=inputs
     )
     print("call", call)
     logger.info(f"ℹ️  Invoking {contract_name}.{function_name}({json.dumps(inputs)})")
-    response = await account.execute(calls=call, max_fee=int(1e17))
-    await account.client.wait_for_tx(response.transaction_hash)
+    nonce_manager = await get_nonce_manager(account, context)
+    response, receipt = await nonce_manager.invoke(call)
+    if wait:
+        await receipt
     logger.info(
         f"✅ {contract_name}.{function_name} invoked at tx: %s",
         hex(response.transaction_hash),
     )
     return response.transaction_hash
 
-async def invoke_cairo0(contract_name, function_name, inputs, address=None):
-    account = await get_starknet_account()
-    deployments = get_deployments()
+@instrumented
+async def invoke_cairo0(
+    contract_name, function_name, inputs, address=None, wait=True, context=None
+):
+    from starknet_py.contract import Contract
+
+    account = await get_starknet_account(context=context)
+    deployments = get_deployments(context)
     contract = Contract(
         deployments[contract_name]["address"] if address is None else address,
         json.load(open(get_v0_artifact(contract_name)))["abi"],
         account,
     )
-    call = contract.functions[function_name].prepare(*inputs, max_fee=int(1e17))
+    call = contract.functions[function_name].prepare(*inputs)
     logger.info(f"ℹ️  Invoking {contract_name}.{function_name}({json.dumps(inputs)})")
-    response = await account.execute(call, max_fee=int(1e17))
-    await account.client.wait_for_tx(response.transaction_hash)
+    nonce_manager = await get_nonce_manager(account, context)
+    response, receipt = await nonce_manager.invoke(call)
+    if wait:
+        await receipt
     logger.info(
         f"✅ {contract_name}.{function_name} invoked at tx: %s",
         hex(response.transaction_hash),
     )
     return response.transaction_hash
 
-async def deploy_with_proxy(contract_name, calldata):
+@instrumented
+async def deploy_with_proxy(contract_name, calldata, wait=True, context=None):
+    from starknet_py.net.udc_deployer.deployer import Deployer
+
     logger.info(f"ℹ️  Deploying with proxy {contract_name}")
-    artifact = get_v0_artifact("proxy")
-    compiled_contract = Path(artifact).read_text()
-    abi = json.loads(compiled_contract)["abi"]
+    abi = get_cairo0_class(get_v0_artifact("proxy"))["abi"]
 
-    class_hash = get_declarations()
+    class_hash = get_declarations(context)
     proxy_contract_class_hash = class_hash["proxy"]
     impl_contract_class_hash = class_hash[contract_name]
 
-    account = await get_starknet_account()
+    account = await get_starknet_account(context=context)
 
     deployer = Deployer()
     deploy_call, address = deployer.create_contract_deployment(
@@ -314,12 +396,14 @@ async def deploy_with_proxy(contract_name, calldata):
         cairo_version=0,
         calldata={
             "implementation_hash": impl_contract_class_hash,
-            "selector": get_selector_from_name("initializer"),
+            "selector": get_selector("initializer"),
             "calldata": calldata,
         },
     )
-    deploy_result = await account.execute(deploy_call, max_fee=int(1e16))
-    await account.client.wait_for_tx(deploy_result.transaction_hash)
+    nonce_manager = await get_nonce_manager(account, context)
+    deploy_result, receipt = await nonce_manager.invoke(deploy_call)
+    if wait:
+        await receipt
 
     logger.info(
         f" ✅ {contract_name} deployed at: {hex(address)}"
@@ -330,14 +414,74 @@ async def deploy_with_proxy(contract_name, calldata):
         "tx": deploy_result.transaction_hash,
     }
 
-async def call_v0(contract_name, function_name, inputs, address=None):
-    account = await get_starknet_account()
-    deployments = get_deployments()
+@instrumented
+async def call_v0(contract_name, function_name, inputs, address=None, context=None):
+    from starknet_py.net.client_models import Call
+
+    context = context or get_context()
     call = Call(
-        to_addr=int(deployments[contract_name]["address"], 16) if address is None else address, 
-        selector=get_selector_from_name(function_name), 
+        to_addr=int(get_deployments(context)[contract_name]["address"], 16) if address is None else address, 
+        selector=get_selector(function_name), 
         calldata=inputs
     )
     logger.info(f"ℹ️  Calling {contract_name}.{function_name}({json.dumps(inputs)})")
-    response = await account.client.call_contract(call)
-    return response
\ No newline at end of file
+    # reads of the same call within a block are served from the cache, through
+    # the JSON-RPC client: the gateway client pulls in cairo-lang and sympy
+    response = await get_call_cache(context.rpc).call_contract(call)
+    return response
+
+@instrumented
+async def get_renewal_states(
+    pairs,
+    address=None,
+    chunk_size=500,
+    block_number="latest",
+    client=None,
+    context=None,
+):
+    # allowance, last_renewal and naming expiry of each (renewer, domain) pair,
+    # read with one get_renewal_states call per chunk of pairs. Chunks are sent
+    # together and read against the same block.
+    from starknet_py.net.client_models import Call
+
+    context = context or get_context()
+    if address is None:
+        address = int(
+            get_deployments(context)["auto_renew_contract_AutoRenewal"]["address"], 16
+        )
+    client = client or get_call_cache(context.rpc)
+    if block_number == "latest":
+        block_number = await client.get_head()
+    chunks = [pairs[i : i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+    results = await asyncio.gather(
+        *(
+            client.call_contract(
+                Call(
+                    to_addr=address,
+                    selector=get_selector("get_renewal_states"),
+                    calldata=[
+                        len(chunk),
+                        *(domain for _, domain in chunk),
+                        len(chunk),
+                        *(renewer for renewer, _ in chunk),
+                    ],
+                ),
+                block_number=block_number,
+            )
+            for chunk in chunks
+        )
+    )
+    # each result is the array length followed by allowance (low, high),
+    # last_renewal and expiry for every pair
+    states = []
+    for result in results:
+        for i in range(1, len(result), 4):
+            low, high, last_renewal, expiry = result[i : i + 4]
+            states.append(
+                {
+                    "allowance": low + (high << 128),
+                    "last_renewal": last_renewal,
+                    "expiry": expiry,
+                }
+            )
+    return states
@@ -1,9 +1,43 @@
+// State of a (renewer, domain) renewal flow, with the expiry of the domain on naming
+#[derive(Copy, Drop, Serde)]
+struct RenewalState {
+    allowance: u256,
+    last_renewal: u64,
+    expiry: u64,
+}
+
+// Renewal flow of a (renewer, domain) pair as stored, both fields packed in a single felt
+#[derive(Copy, Drop, PartialEq)]
+struct RenewalFlow {
+    allowance: u128,
+    last_renewal: u64,
+}
+
+const SHIFT_128: felt252 = 0x100000000000000000000000000000000;
+
+impl RenewalFlowStorePacking of starknet::StorePacking<RenewalFlow, felt252> {
+    fn pack(value: RenewalFlow) -> felt252 {
+        value.allowance.into() + value.last_renewal.into() * SHIFT_128
+    }
+
+    fn unpack(value: felt252) -> RenewalFlow {
+        let value: u256 = value.into();
+        RenewalFlow { allowance: value.low, last_renewal: value.high.try_into().unwrap() }
+    }
+}
+
 #[starknet::interface]
 trait IAutoRenewal<TContractState> {
     fn get_renewing_allowance(
         self: @TContractState, domain: felt252, renewer: starknet::ContractAddress,
     ) -> u256;
 
+    fn get_renewal_states(
+        self: @TContractState,
+        domains: array::Span::<felt252>,
+        renewers: array::Span::<starknet::ContractAddress>,
+    ) -> Array<RenewalState>;
+
     fn get_contracts(
         self: @TContractState
     ) -> (starknet::ContractAddress, starknet::ContractAddress, starknet::ContractAddress);
@@ -31,6 +65,15 @@ trait IAutoRenewal<TContractState> {
         metadatas: array::Span::<felt252>,
     );
 
+    fn batch_renew_aggregated(
+        ref self: TContractState,
+        domains: array::Span::<felt252>,
+        renewers: array::Span::<starknet::ContractAddress>,
+        domain_prices: array::Span::<u256>,
+        tax_prices: array::Span::<u256>,
+        metadatas: array::Span::<felt252>,
+    );
+
     fn start_admin_update(ref self: TContractState, new_admin: starknet::ContractAddress,);
     fn confirm_admin_update(ref self: TContractState);
     fn update_tax_contract(ref self: TContractState, new_addr: starknet::ContractAddress,);
@@ -49,6 +92,7 @@ mod AutoRenewal {
     use array::ArrayTrait;
     use openzeppelin::token::erc20::interface::{IERC20CamelDispatcher, IERC20CamelDispatcherTrait};
     use naming::interface::naming::{INamingDispatcher, INamingDispatcherTrait};
+    use super::{RenewalState, RenewalFlow};
 
     #[storage]
     struct Storage {
@@ -59,10 +103,8 @@ mod AutoRenewal {
         temp_admin: ContractAddress,
         whitelisted_renewer: ContractAddress,
         can_renew: bool,
-        // (renewer, domain) -> allowance
-        renewing_allowance: LegacyMap::<(ContractAddress, felt252), u256>,
-        // (renewer, domain) -> timestamp
-        last_renewal: LegacyMap::<(ContractAddress, felt252), u64>,
+        // (renewer, domain) -> allowance & last renewal timestamp
+        renewals: LegacyMap::<(ContractAddress, felt252), RenewalFlow>,
     }
 
     //
@@ -187,7 +229,38 @@ mod AutoRenewal {
         fn get_renewing_allowance(
             self: @ContractState, domain: felt252, renewer: ContractAddress
         ) -> u256 {
-            self.renewing_allowance.read((renewer, domain))
+            self.renewals.read((renewer, domain)).allowance.into()
+        }
+
+        fn get_renewal_states(
+            self: @ContractState,
+            domains: array::Span::<felt252>,
+            renewers: array::Span::<starknet::ContractAddress>,
+        ) -> Array<RenewalState> {
+            assert(domains.len() == renewers.len(), 'Domain & renewers mismatch len');
+            let naming = INamingDispatcher { contract_address: self.naming_contract.read() };
+            let mut states = ArrayTrait::new();
+
+            let mut domains = domains;
+            let mut renewers = renewers;
+
+            loop {
+                if domains.len() == 0 {
+                    break;
+                }
+                let domain = *domains.pop_front().unwrap();
+                let renewer = *renewers.pop_front().unwrap();
+                let flow = self.renewals.read((renewer, domain));
+                states
+                    .append(
+                        RenewalState {
+                            allowance: flow.allowance.into(),
+                            last_renewal: flow.last_renewal,
+                            expiry: naming.domain_to_data(array![domain].span()).expiry,
+                        }
+                    );
+            };
+            states
         }
 
         fn get_contracts(
@@ -200,22 +273,39 @@ mod AutoRenewal {
             ref self: ContractState, domain: felt252, allowance: u256, meta_hash: felt252
         ) {
             let caller = get_caller_address();
-            self.renewing_allowance.write((caller, domain), allowance);
-
+            // allowances are stored on 128 bits, which is way more than the ETH supply,
+            // higher ones (eg. an infinite allowance) are capped, and emitted capped so
+            // that indexers store the same allowance as the contract
+            let stored_allowance = if allowance.high == 0 {
+                allowance.low
+            } else {
+                integer::BoundedInt::max()
+            };
             // we erase the previous renewal date
-            self.last_renewal.write((caller, domain), 0);
+            self
+                .renewals
+                .write(
+                    (caller, domain), RenewalFlow { allowance: stored_allowance, last_renewal: 0 }
+                );
 
             self
                 .emit(
                     Event::UpdatedRenewal(
-                        UpdatedRenewal { domain, renewer: caller, allowance, meta_hash }
+                        UpdatedRenewal {
+                            domain, renewer: caller, allowance: stored_allowance.into(), meta_hash
+                        }
                     )
                 )
         }
 
         fn disable_renewals(ref self: ContractState, domain: felt252) {
             let caller = get_caller_address();
-            self.renewing_allowance.write((caller, domain), 0);
+            let flow = self.renewals.read((caller, domain));
+            self
+                .renewals
+                .write(
+                    (caller, domain), RenewalFlow { allowance: 0, last_renewal: flow.last_renewal }
+                );
 
             self.emit(Event::DisabledRenewal(DisabledRenewal { domain, renewer: caller, }))
         }
@@ -271,6 +361,66 @@ mod AutoRenewal {
             }
         }
 
+        // Same as batch_renew, but the contracts addresses and the block timestamp are
+        // read once for the whole batch and the taxes are sent in a single transfer
+        fn batch_renew_aggregated(
+            ref self: ContractState,
+            domains: array::Span::<felt252>,
+            renewers: array::Span::<starknet::ContractAddress>,
+            domain_prices: array::Span::<u256>,
+            tax_prices: array::Span::<u256>,
+            metadatas: array::Span::<felt252>,
+        ) {
+            assert(self.can_renew.read(), 'Contract is disabled');
+            assert(
+                get_caller_address() == self.whitelisted_renewer.read(), 'You are not whitelisted'
+            );
+            assert(domains.len() == renewers.len(), 'Domain & renewers mismatch len');
+            assert(domains.len() == domain_prices.len(), 'Domain & prices mismatch len');
+            assert(domains.len() == tax_prices.len(), 'Domain & taxes mismatch len');
+            assert(domains.len() == metadatas.len(), 'Domain & metadatas mismatch len');
+
+            let naming = INamingDispatcher { contract_address: self.naming_contract.read() };
+            let erc20 = IERC20CamelDispatcher { contract_address: self.erc20_contract.read() };
+            let contract = get_contract_address();
+            let block_timestamp = get_block_timestamp();
+            let mut total_tax: u256 = 0;
+
+            let mut domains = domains;
+            let mut renewers = renewers;
+            let mut domain_prices = domain_prices;
+            let mut tax_prices = tax_prices;
+            let mut metadatas = metadatas;
+
+            loop {
+                if domains.len() == 0 {
+                    break;
+                }
+                let domain = *domains.pop_front().unwrap();
+                let renewer = *renewers.pop_front().unwrap();
+                let domain_price = *domain_prices.pop_front().unwrap();
+                let tax_price = *tax_prices.pop_front().unwrap();
+                let metadata = *metadatas.pop_front().unwrap();
+                let total_price = self
+                    ._record_renewal(
+                        naming,
+                        block_timestamp,
+                        domain,
+                        renewer,
+                        domain_price,
+                        tax_price,
+                        metadata
+                    );
+                // the tax stays on this contract until the end of the batch
+                erc20.transferFrom(renewer, contract, total_price);
+                naming.renew(domain, 365_u16, ContractAddressZeroable::zero(), 0, metadata);
+                total_tax = total_tax + tax_price;
+            };
+
+            // transfer the taxes of the whole batch to the tax contract address
+            erc20.transfer(self.tax_contract.read(), total_tax);
+        }
+
         // Admin function to update admin address and the tax contract address
         fn start_admin_update(ref self: ContractState, new_admin: ContractAddress,) {
             assert(get_caller_address() == self.admin.read(), 'Caller not admin');
@@ -335,8 +485,46 @@ mod AutoRenewal {
             tax_price: u256,
             metadata: felt252,
         ) {
-            let naming = self.naming_contract.read();
-            let allowance = self.renewing_allowance.read((renewer, root_domain));
+            let naming = INamingDispatcher { contract_address: self.naming_contract.read() };
+            let total_price = self
+                ._record_renewal(
+                    naming,
+                    get_block_timestamp(),
+                    root_domain,
+                    renewer,
+                    domain_price,
+                    tax_price,
+                    metadata
+                );
+            let contract = get_contract_address();
+            let erc20 = self.erc20_contract.read();
+            let _tax_contract = self.tax_contract.read();
+
+            // Transfer allowance (including tax), will be canceled if the tx fails
+            IERC20CamelDispatcher { contract_address: erc20 }
+                .transferFrom(renewer, contract, total_price);
+            // transfer tax price to tax contract address
+            IERC20CamelDispatcher { contract_address: erc20 }.transfer(_tax_contract, tax_price);
+            // spend the remaining money to renew the domain
+            // if something remains after this, it can be considered as lost by the user,
+            // we keep the ability to claim it back but can't guarantee we will do it
+            naming.renew(root_domain, 365_u16, ContractAddressZeroable::zero(), 0, metadata);
+        }
+
+        // Checks the renewal can happen, then records it and emits its event, all
+        // before any call to the other contracts. Returns the price to debit.
+        fn _record_renewal(
+            ref self: ContractState,
+            naming: INamingDispatcher,
+            block_timestamp: u64,
+            root_domain: felt252,
+            renewer: ContractAddress,
+            domain_price: u256,
+            tax_price: u256,
+            metadata: felt252,
+        ) -> u256 {
+            let flow = self.renewals.read((renewer, root_domain));
+            let allowance: u256 = flow.allowance.into();
             let total_price = domain_price + tax_price;
             // We keep the ability to specify a domain_price inferior to the allowance
             // in case we lowered the prices of stark domains and don't want to debit
@@ -344,22 +532,24 @@ mod AutoRenewal {
             assert(allowance >= total_price, 'Renewal allowance insufficient');
 
             // Check domain has not been renew yet this year
-            let block_timestamp = get_block_timestamp();
-            let last_renewed = self.last_renewal.read((renewer, root_domain));
+            let last_renewed = flow.last_renewal;
             // 364 because we keep adding one day margin to the existing month,
             // if we take more than a day to renew, the margin will shrink.
             assert(block_timestamp - last_renewed > 86400_u64 * 364_u64, 'Domain already renewed');
 
             // Check domain is set to expire within a month
-            let expiry: u64 = INamingDispatcher { contract_address: naming }
-                .domain_to_data(array![root_domain].span())
-                .expiry;
+            let expiry: u64 = naming.domain_to_data(array![root_domain].span()).expiry;
             assert(expiry <= block_timestamp + (86400_u64 * 30_u64), 'Domain not set to expire');
 
             // Renew domain
             // last_renewal is updated before external contract calls to prevent reentrancy attacks
             // if the naming contract was compromised
-            self.last_renewal.write((renewer, root_domain), block_timestamp);
+            self
+                .renewals
+                .write(
+                    (renewer, root_domain),
+                    RenewalFlow { allowance: flow.allowance, last_renewal: block_timestamp }
+                );
             // events is sent before calls to other contracts to prevent a reordering via reentrancy attack
             self
                 .emit(
@@ -375,20 +565,7 @@ mod AutoRenewal {
                         }
                     )
                 );
-            let contract = get_contract_address();
-            let erc20 = self.erc20_contract.read();
-            let _tax_contract = self.tax_contract.read();
-
-            // Transfer allowance (including tax), will be canceled if the tx fails
-            IERC20CamelDispatcher { contract_address: erc20 }
-                .transferFrom(renewer, contract, total_price);
-            // transfer tax price to tax contract address
-            IERC20CamelDispatcher { contract_address: erc20 }.transfer(_tax_contract, tax_price);
-            // spend the remaining money to renew the domain
-            // if something remains after this, it can be considered as lost by the user,
-            // we keep the ability to claim it back but can't guarantee we will do it
-            INamingDispatcher { contract_address: naming }
-                .renew(root_domain, 365_u16, ContractAddressZeroable::zero(), 0, metadata);
+            total_price
         }
     }
 }
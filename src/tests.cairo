@@ -3,3 +3,4 @@ mod utils;
 mod mocks;
 mod common;
 mod test_renewals;
+mod test_storage;
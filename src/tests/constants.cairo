@@ -32,3 +32,12 @@ fn TH0RGAL_DOMAIN() -> felt252 {
 fn OTHER_DOMAIN() -> felt252 {
     13847469359445559
 }
+
+// 7 letter domains, same price as OTHER_DOMAIN
+fn THIRD_DOMAIN() -> felt252 {
+    3010936385
+}
+
+fn FOURTH_DOMAIN() -> felt252 {
+    3010936386
+}
@@ -1 +1,2 @@
 mod erc20;
+mod storage_layouts;
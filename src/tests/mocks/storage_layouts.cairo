@@ -0,0 +1,84 @@
+// Storage accesses of enable_renewals and _renew with the previous layout, a u256
+// allowance and a u64 timestamp in two maps, and with the packed one of AutoRenewal
+#[starknet::interface]
+trait IStorageLayouts<TContractState> {
+    fn legacy_enable(
+        ref self: TContractState,
+        renewer: starknet::ContractAddress,
+        domain: felt252,
+        allowance: u256,
+    );
+    fn legacy_renew(
+        ref self: TContractState,
+        renewer: starknet::ContractAddress,
+        domain: felt252,
+        timestamp: u64,
+    ) -> (u256, u64);
+    fn packed_enable(
+        ref self: TContractState,
+        renewer: starknet::ContractAddress,
+        domain: felt252,
+        allowance: u256,
+    );
+    fn packed_renew(
+        ref self: TContractState,
+        renewer: starknet::ContractAddress,
+        domain: felt252,
+        timestamp: u64,
+    ) -> (u256, u64);
+}
+
+#[starknet::contract]
+mod StorageLayouts {
+    use starknet::ContractAddress;
+    use auto_renew_contract::auto_renewal::RenewalFlow;
+
+    #[storage]
+    struct Storage {
+        renewing_allowance: LegacyMap::<(ContractAddress, felt252), u256>,
+        last_renewal: LegacyMap::<(ContractAddress, felt252), u64>,
+        renewals: LegacyMap::<(ContractAddress, felt252), RenewalFlow>,
+    }
+
+    #[external(v0)]
+    impl StorageLayoutsImpl of super::IStorageLayouts<ContractState> {
+        fn legacy_enable(
+            ref self: ContractState, renewer: ContractAddress, domain: felt252, allowance: u256
+        ) {
+            self.renewing_allowance.write((renewer, domain), allowance);
+            self.last_renewal.write((renewer, domain), 0);
+        }
+
+        fn legacy_renew(
+            ref self: ContractState, renewer: ContractAddress, domain: felt252, timestamp: u64
+        ) -> (u256, u64) {
+            let allowance = self.renewing_allowance.read((renewer, domain));
+            let last_renewal = self.last_renewal.read((renewer, domain));
+            self.last_renewal.write((renewer, domain), timestamp);
+            (allowance, last_renewal)
+        }
+
+        fn packed_enable(
+            ref self: ContractState, renewer: ContractAddress, domain: felt252, allowance: u256
+        ) {
+            self
+                .renewals
+                .write(
+                    (renewer, domain), RenewalFlow { allowance: allowance.low, last_renewal: 0 }
+                );
+        }
+
+        fn packed_renew(
+            ref self: ContractState, renewer: ContractAddress, domain: felt252, timestamp: u64
+        ) -> (u256, u64) {
+            let flow = self.renewals.read((renewer, domain));
+            self
+                .renewals
+                .write(
+                    (renewer, domain),
+                    RenewalFlow { allowance: flow.allowance, last_renewal: timestamp }
+                );
+            (flow.allowance.into(), flow.last_renewal)
+        }
+    }
+}
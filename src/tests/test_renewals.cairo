@@ -9,7 +9,7 @@ use super::utils;
 use super::common::deploy_contracts;
 use super::constants::{
     OTHER, ADMIN, ZERO, BLOCK_TIMESTAMP, BLOCK_TIMESTAMP_ADD, TH0RGAL_DOMAIN, OTHER_DOMAIN,
-    BLOCK_TIMESTAMP_EXPIRED
+    BLOCK_TIMESTAMP_EXPIRED, THIRD_DOMAIN, FOURTH_DOMAIN
 };
 
 use identity::{
@@ -135,6 +135,229 @@ fn test_batch_renew_domain() {
     assert(new_expiry.into() >= limit, 'new expiry should be 365 days');
 }
 
+fn drop_logs(address: ContractAddress) {
+    loop {
+        if testing::pop_log_raw(address).is_none() {
+            break;
+        }
+    }
+}
+
+#[test]
+#[available_gas(40000000)]
+fn test_batch_renew_aggregated_matches_batch_renew() {
+    // initialize contracts
+    let (erc20, pricing, starknetid, naming, autorenewal) = deploy_contracts();
+    let tax_contract = contract_address_const::<0x111>();
+    let tax_price: u256 = 100;
+    testing::set_block_timestamp(BLOCK_TIMESTAMP());
+
+    // buy 4 domains of the same price for a year
+    testing::set_contract_address(ADMIN());
+    let (_, price) = pricing.compute_buy_price(7, 365);
+    erc20.approve(naming.contract_address, 4 * price);
+    let mut domains = array![TH0RGAL_DOMAIN(), OTHER_DOMAIN(), THIRD_DOMAIN(), FOURTH_DOMAIN()]
+        .span();
+    let mut token_id: u128 = 1;
+    loop {
+        if domains.len() == 0 {
+            break;
+        }
+        let domain = *domains.pop_front().unwrap();
+        starknetid.mint(token_id);
+        naming.buy(token_id, domain, 365_u16, ZERO(), ZERO(), 0, 0);
+        autorenewal.enable_renewals(domain, price + tax_price, 0);
+        token_id += 1;
+    };
+    erc20.approve(autorenewal.contract_address, integer::BoundedInt::max());
+
+    testing::set_block_timestamp(BLOCK_TIMESTAMP_ADD());
+    drop_logs(autorenewal.contract_address);
+
+    // renew the first two domains with the per entry path
+    let balance = erc20.balanceOf(ADMIN());
+    autorenewal
+        .batch_renew(
+            array![TH0RGAL_DOMAIN(), OTHER_DOMAIN()].span(),
+            array![ADMIN(), ADMIN()].span(),
+            array![price, price].span(),
+            array![tax_price, tax_price].span(),
+            array![0, 0].span()
+        );
+    let spent = balance - erc20.balanceOf(ADMIN());
+    let tax_balance = erc20.balanceOf(tax_contract);
+    let contract_balance = erc20.balanceOf(autorenewal.contract_address);
+    let (keys1, data1) = testing::pop_log_raw(autorenewal.contract_address).unwrap();
+    let (keys2, data2) = testing::pop_log_raw(autorenewal.contract_address).unwrap();
+    assert(testing::pop_log_raw(autorenewal.contract_address).is_none(), 'too many events');
+
+    // renew the other two with the aggregated one
+    let balance = erc20.balanceOf(ADMIN());
+    autorenewal
+        .batch_renew_aggregated(
+            array![THIRD_DOMAIN(), FOURTH_DOMAIN()].span(),
+            array![ADMIN(), ADMIN()].span(),
+            array![price, price].span(),
+            array![tax_price, tax_price].span(),
+            array![0, 0].span()
+        );
+
+    // same amounts should be debited and received
+    assert(balance - erc20.balanceOf(ADMIN()) == spent, 'renewer debited differently');
+    assert(spent == 2 * (price + tax_price), 'wrong amount debited');
+    assert(
+        erc20.balanceOf(tax_contract) - tax_balance == tax_balance, 'tax received differently'
+    );
+    assert(tax_balance == 2 * tax_price, 'wrong tax received');
+    assert(
+        erc20.balanceOf(autorenewal.contract_address) == contract_balance,
+        'contract balance changed'
+    );
+
+    // same events, except for the renewed domain
+    let (keys3, data3) = testing::pop_log_raw(autorenewal.contract_address).unwrap();
+    let (keys4, data4) = testing::pop_log_raw(autorenewal.contract_address).unwrap();
+    assert(testing::pop_log_raw(autorenewal.contract_address).is_none(), 'too many events');
+    assert(data3 == data1, 'event data mismatch');
+    assert(data4 == data2, 'event data mismatch');
+    assert(keys3.len() == keys1.len(), 'event keys mismatch');
+    assert(*keys3.at(0) == *keys1.at(0), 'event keys mismatch');
+    assert(*keys4.at(0) == *keys2.at(0), 'event keys mismatch');
+    assert(*keys1.at(1) == TH0RGAL_DOMAIN(), 'wrong domain renewed');
+    assert(*keys2.at(1) == OTHER_DOMAIN(), 'wrong domain renewed');
+    assert(*keys3.at(1) == THIRD_DOMAIN(), 'wrong domain renewed');
+    assert(*keys4.at(1) == FOURTH_DOMAIN(), 'wrong domain renewed');
+
+    // and the same expiries
+    let expiry = naming.domain_to_data(array![TH0RGAL_DOMAIN()].span()).expiry;
+    assert(
+        naming.domain_to_data(array![THIRD_DOMAIN()].span()).expiry == expiry,
+        'expiry mismatch'
+    );
+    assert(
+        naming.domain_to_data(array![FOURTH_DOMAIN()].span()).expiry == expiry,
+        'expiry mismatch'
+    );
+}
+
+#[test]
+#[available_gas(20000000)]
+#[should_panic(expected: ('Domain already renewed', 'ENTRYPOINT_FAILED',))]
+fn test_batch_renew_aggregated_fail_already_renewed() {
+    // initialize contracts
+    let (erc20, pricing, starknetid, naming, autorenewal) = deploy_contracts();
+    testing::set_block_timestamp(BLOCK_TIMESTAMP());
+    let token_id: u128 = 1;
+
+    // buy TH0RGAL_DOMAIN for a year
+    testing::set_contract_address(ADMIN());
+    let (_, price) = pricing.compute_buy_price(7, 365);
+    erc20.approve(naming.contract_address, price);
+    starknetid.mint(token_id);
+    naming.buy(token_id, TH0RGAL_DOMAIN(), 365_u16, ZERO(), ZERO(), 0, 0);
+
+    testing::set_block_timestamp(BLOCK_TIMESTAMP_ADD());
+    autorenewal.enable_renewals(TH0RGAL_DOMAIN(), 2 * price, 0);
+    erc20.approve(autorenewal.contract_address, integer::BoundedInt::max());
+
+    // Should revert on the second entry, as with batch_renew
+    autorenewal
+        .batch_renew_aggregated(
+            array![TH0RGAL_DOMAIN(), TH0RGAL_DOMAIN()].span(),
+            array![ADMIN(), ADMIN()].span(),
+            array![price, price].span(),
+            array![0, 0].span(),
+            array![0, 0].span()
+        );
+}
+
+#[test]
+#[available_gas(20000000)]
+fn test_get_renewal_states() {
+    // initialize contracts
+    let (erc20, pricing, starknetid, naming, autorenewal) = deploy_contracts();
+    testing::set_block_timestamp(BLOCK_TIMESTAMP());
+    let token_id1: u128 = 1;
+    let token_id2: u128 = 2;
+
+    // buy TH0RGAL_DOMAIN & OTHER_DOMAIN for a year
+    testing::set_contract_address(ADMIN());
+    let (_, price) = pricing.compute_buy_price(7, 365);
+    erc20.approve(naming.contract_address, 2 * price);
+    starknetid.mint(token_id1);
+    naming.buy(token_id1, TH0RGAL_DOMAIN(), 365_u16, ZERO(), ZERO(), 0, 0);
+    starknetid.mint(token_id2);
+    naming.buy(token_id2, OTHER_DOMAIN(), 365_u16, ZERO(), ZERO(), 0, 0);
+
+    // Toggle renewals & renew TH0RGAL_DOMAIN only
+    autorenewal.enable_renewals(TH0RGAL_DOMAIN(), price, 0);
+    autorenewal.enable_renewals(OTHER_DOMAIN(), 2 * price, 0);
+    erc20.approve(autorenewal.contract_address, integer::BoundedInt::max());
+    testing::set_block_timestamp(BLOCK_TIMESTAMP_ADD());
+    autorenewal.renew(TH0RGAL_DOMAIN(), ADMIN(), price, 0, 0);
+
+    let states = autorenewal
+        .get_renewal_states(
+            array![TH0RGAL_DOMAIN(), OTHER_DOMAIN(), TH0RGAL_DOMAIN()].span(),
+            array![ADMIN(), ADMIN(), OTHER()].span()
+        );
+    assert(states.len() == 3, 'wrong number of states');
+
+    let state = *states.at(0);
+    assert(state.allowance == price, 'wrong allowance');
+    assert(state.last_renewal == BLOCK_TIMESTAMP_ADD(), 'wrong last renewal');
+    assert(
+        state.expiry == naming.domain_to_data(array![TH0RGAL_DOMAIN()].span()).expiry,
+        'wrong expiry'
+    );
+
+    let state = *states.at(1);
+    assert(state.allowance == 2 * price, 'wrong allowance');
+    assert(state.last_renewal == 0, 'wrong last renewal');
+    assert(state.expiry == (86400 * 365) + BLOCK_TIMESTAMP(), 'wrong expiry');
+
+    // no renewal flow for OTHER(), the domain expiry is still returned
+    let state = *states.at(2);
+    assert(state.allowance == 0, 'wrong allowance');
+    assert(state.last_renewal == 0, 'wrong last renewal');
+    assert(state.expiry == (*states.at(0)).expiry, 'wrong expiry');
+}
+
+#[test]
+#[available_gas(20000000)]
+fn test_enable_renewals_emits_capped_allowance() {
+    // initialize contracts
+    let (erc20, pricing, starknetid, naming, autorenewal) = deploy_contracts();
+    testing::set_block_timestamp(BLOCK_TIMESTAMP());
+    let token_id: u128 = 1;
+
+    // buy TH0RGAL_DOMAIN for a year
+    testing::set_contract_address(ADMIN());
+    let (_, price) = pricing.compute_buy_price(7, 365);
+    erc20.approve(naming.contract_address, price);
+    starknetid.mint(token_id);
+    naming.buy(token_id, TH0RGAL_DOMAIN(), 365_u16, ZERO(), ZERO(), 0, 0);
+    drop_logs(autorenewal.contract_address);
+
+    // an allowance above 128 bits is stored capped
+    let allowance = u256 { low: 1, high: 1 };
+    autorenewal.enable_renewals(TH0RGAL_DOMAIN(), allowance, 42);
+    let max_u128: u128 = integer::BoundedInt::max();
+    let states = autorenewal
+        .get_renewal_states(array![TH0RGAL_DOMAIN()].span(), array![ADMIN()].span());
+    assert((*states.at(0)).allowance == max_u128.into(), 'allowance should be capped');
+
+    // and emitted as stored
+    let (keys, data) = testing::pop_log_raw(autorenewal.contract_address).unwrap();
+    assert(testing::pop_log_raw(autorenewal.contract_address).is_none(), 'too many events');
+    assert(*keys.at(1) == TH0RGAL_DOMAIN(), 'wrong domain emitted');
+    assert(data.len() == 4, 'wrong event data');
+    assert(*data.at(0) == ADMIN().into(), 'wrong renewer emitted');
+    assert(*data.at(1) == max_u128.into(), 'wrong allowance.low emitted');
+    assert(*data.at(2) == 0, 'wrong allowance.high emitted');
+    assert(*data.at(3) == 42, 'wrong meta_hash emitted');
+}
+
 #[test]
 #[available_gas(20000000)]
 #[should_panic(expected: ('Renewal allowance insufficient', 'ENTRYPOINT_FAILED',))]
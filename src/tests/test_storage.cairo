@@ -0,0 +1,89 @@
+use array::ArrayTrait;
+use option::OptionTrait;
+use traits::Into;
+
+use super::utils;
+use super::common::deploy_contracts;
+use super::constants::{ADMIN, TH0RGAL_DOMAIN, OTHER_DOMAIN, BLOCK_TIMESTAMP_ADD};
+use super::mocks::storage_layouts::{
+    StorageLayouts, IStorageLayoutsDispatcher, IStorageLayoutsDispatcherTrait
+};
+use auto_renew_contract::auto_renewal::{
+    RenewalFlow, RenewalFlowStorePacking, IAutoRenewalDispatcherTrait
+};
+
+fn deploy_layouts() -> IStorageLayoutsDispatcher {
+    let layouts = utils::deploy(StorageLayouts::TEST_CLASS_HASH, array![]);
+    IStorageLayoutsDispatcher { contract_address: layouts }
+}
+
+fn available_gas() -> u128 {
+    // flushes the gas withdrawn so far before reading what remains
+    gas::withdraw_gas().unwrap();
+    core::testing::get_available_gas()
+}
+
+#[test]
+#[available_gas(2000000)]
+fn test_renewal_flow_packing() {
+    let flow = RenewalFlow {
+        allowance: integer::BoundedInt::max(), last_renewal: integer::BoundedInt::max()
+    };
+    let unpacked = RenewalFlowStorePacking::unpack(RenewalFlowStorePacking::pack(flow));
+    assert(unpacked == flow, 'max values not unpacked');
+
+    let flow = RenewalFlow { allowance: 0, last_renewal: BLOCK_TIMESTAMP_ADD() };
+    let unpacked = RenewalFlowStorePacking::unpack(RenewalFlowStorePacking::pack(flow));
+    assert(unpacked == flow, 'timestamp not unpacked');
+
+    let flow = RenewalFlow { allowance: 600, last_renewal: 0 };
+    assert(RenewalFlowStorePacking::pack(flow) == 600, 'allowance not in low bits');
+}
+
+#[test]
+#[available_gas(20000000)]
+fn test_enable_renewals_caps_allowance() {
+    let (erc20, pricing, starknetid, naming, autorenewal) = deploy_contracts();
+
+    // infinite allowances are stored as the max u128
+    autorenewal.enable_renewals(TH0RGAL_DOMAIN(), integer::BoundedInt::max(), 0);
+    let allowance = autorenewal.get_renewing_allowance(TH0RGAL_DOMAIN(), ADMIN());
+    let max_u128: u128 = integer::BoundedInt::max();
+    assert(allowance == max_u128.into(), 'allowance should be capped');
+
+    // and disabling keeps nothing of it
+    autorenewal.disable_renewals(TH0RGAL_DOMAIN());
+    let allowance = autorenewal.get_renewing_allowance(TH0RGAL_DOMAIN(), ADMIN());
+    assert(allowance == 0, 'allowance should be 0');
+}
+
+#[test]
+#[available_gas(20000000)]
+fn test_packed_layout_costs() {
+    let layouts = deploy_layouts();
+    let allowance: u256 = 8999999999999875;
+
+    // enable_renewals: 3 storage writes (u256 over two slots and the timestamp) against 1
+    let before = available_gas();
+    layouts.legacy_enable(ADMIN(), TH0RGAL_DOMAIN(), allowance);
+    let legacy_enable = before - available_gas();
+    let before = available_gas();
+    layouts.packed_enable(ADMIN(), OTHER_DOMAIN(), allowance);
+    let packed_enable = before - available_gas();
+    assert(packed_enable < legacy_enable, 'packed enable costs more');
+
+    // _renew: 3 storage reads and 1 write against 1 read and 1 write
+    let before = available_gas();
+    let legacy = layouts.legacy_renew(ADMIN(), TH0RGAL_DOMAIN(), BLOCK_TIMESTAMP_ADD());
+    let legacy_renew = before - available_gas();
+    let before = available_gas();
+    let packed = layouts.packed_renew(ADMIN(), OTHER_DOMAIN(), BLOCK_TIMESTAMP_ADD());
+    let packed_renew = before - available_gas();
+    assert(packed_renew < legacy_renew, 'packed renew costs more');
+
+    // both layouts read the same values
+    assert(legacy == (allowance, 0), 'wrong legacy values');
+    assert(packed == legacy, 'wrong packed values');
+    let packed = layouts.packed_renew(ADMIN(), OTHER_DOMAIN(), 0);
+    assert(packed == (allowance, BLOCK_TIMESTAMP_ADD()), 'timestamp not written');
+}